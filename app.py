@@ -1,20 +1,25 @@
 # uiautodev/app.py
+import asyncio
 import json
 import logging
+import multiprocessing
 import os
 import platform
 import signal
 import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any, AsyncGenerator, Dict, List, Optional
 
 import jedi
+import orjson
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, File, HTTPException, Request, Response, UploadFile
-from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import (
     JSONResponse,
+    ORJSONResponse,
     RedirectResponse,
     StreamingResponse,
 )
@@ -44,7 +49,7 @@ if not DOTENV_PATH.exists():
 # --- End of early .env loading ---
 
 from __init__ import __version__
-from common import convert_bytes_to_image, ocr_image
+from common import convert_file_to_image, ocr_image
 from model import ChatMessageContent as LlmServiceChatMessage
 from model import Node
 from provider import AndroidProvider
@@ -53,27 +58,113 @@ from services.llm_service import (
     LlmServiceChatRequest,
     generate_chat_completion_stream,
 )
+from utils import jedi_worker
 
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="uiautodev Local Server",
     description="Backend server for the local uiautodev inspection and automation tool.",
     version=__version__,
+    default_response_class=ORJSONResponse,
 )
 
+
+@app.on_event("startup")
+async def log_event_loop_implementation() -> None:
+    # uvloop/httptools are requested explicitly in uvicorn.run(); log what is
+    # actually driving the server so a fallback to asyncio/h11 is visible.
+    loop_cls = asyncio.get_running_loop().__class__
+    logger.info(f"Event loop implementation: {loop_cls.__module__}.{loop_cls.__name__}")
+
+
 # --- Global State for Tracking Running Processes ---
 ACTIVE_PROCESSES: Dict[str, int] = {}
 
 
 
 # --- Middleware ---
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["GET", "POST"],
-    allow_headers=["*"],
-)
+class CORSPureASGI:
+    """
+    Pure-ASGI CORS middleware equivalent to the previous CORSMiddleware setup
+    (any origin, credentials allowed, GET/POST, any header).
+
+    Works directly on the raw ASGI header lists instead of allocating
+    Request/Response wrappers, and all constant header bytes are encoded
+    once at construction time.
+    """
+
+    ALLOW_METHODS = ("GET", "POST")
+
+    def __init__(self, app, allow_origins: List[str]):
+        self.app = app
+        self._allow_all_origins = "*" in allow_origins
+        self._allow_origins = frozenset(o.encode("latin-1") for o in allow_origins)
+        self._allow_methods = frozenset(m.encode("latin-1") for m in self.ALLOW_METHODS)
+        self._simple_headers = [
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+        self._preflight_headers = [
+            (b"access-control-allow-methods", ", ".join(self.ALLOW_METHODS).encode()),
+            (b"access-control-allow-credentials", b"true"),
+            (b"access-control-max-age", b"600"),
+            (b"vary", b"Origin"),
+            (b"content-type", b"text/plain; charset=utf-8"),
+        ]
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = request_method = request_headers = None
+        for key, value in scope["headers"]:
+            if key == b"origin":
+                origin = value
+            elif key == b"access-control-request-method":
+                request_method = value
+            elif key == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None or not (
+            self._allow_all_origins or origin in self._allow_origins
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._preflight_response(origin, request_method, request_headers, send)
+            return
+
+        # Credentials are allowed, so the origin is echoed rather than "*".
+        extra_headers = [(b"access-control-allow-origin", origin), *self._simple_headers]
+
+        async def send_with_cors(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def _preflight_response(
+        self, origin: bytes, request_method: bytes, request_headers, send
+    ) -> None:
+        if request_method in self._allow_methods:
+            status, body = 200, b"OK"
+        else:
+            status, body = 400, b"Disallowed CORS method"
+        headers = [
+            (b"access-control-allow-origin", origin),
+            # allow_headers="*": mirror whatever the browser asked for.
+            (b"access-control-allow-headers", request_headers or b"*"),
+            *self._preflight_headers,
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+app.add_middleware(CORSPureASGI, allow_origins=["*"])
 
 # --- Providers and Routers ---
 android_provider = AndroidProvider()
@@ -141,7 +232,32 @@ except Exception as e:
     jedi_project = None
 
 
-@app.post("/api/python/completions", response_model=List[PythonCompletionSuggestion])
+# Completions run in worker processes so CPU-bound Jedi inference never blocks
+# the event loop. Workers are spawned lazily on the first completion request;
+# spawn, not fork: by then uvicorn's threads are running in this process.
+JEDI_POOL = ProcessPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1),
+    mp_context=multiprocessing.get_context("spawn"),
+    initializer=jedi_worker.init_worker,
+    initargs=(str(PROJECT_ROOT), list(sys.path)),
+)
+
+# LRU cache of completion results, kept in this process so hits never cross
+# the process boundary. Keyed by (code, filename, line, column).
+COMPLETION_CACHE_SIZE = 512
+_completion_cache: OrderedDict = OrderedDict()
+
+
+@app.on_event("shutdown")
+def shutdown_jedi_pool() -> None:
+    JEDI_POOL.shutdown(wait=False, cancel_futures=True)
+
+
+@app.post(
+    "/api/python/completions",
+    response_model=None,
+    responses={200: {"model": List[PythonCompletionSuggestion]}},
+)
 async def get_python_completions(request_data: PythonCompletionRequest):
     if not jedi_project:
         logger.error("Jedi project not initialized, cannot provide completions.")
@@ -149,23 +265,21 @@ async def get_python_completions(request_data: PythonCompletionRequest):
     try:
         jedi_line = request_data.line + 1
         jedi_column = request_data.column
-        script = jedi.Script(
-            code=request_data.code, path=request_data.filename, project=jedi_project
-        )
-        completions = script.complete(line=jedi_line, column=jedi_column)
-        suggestions = []
-        if completions:
-            for comp in completions:
-                display_text_value = getattr(comp, "name_with_symbols", comp.name)
-                text_to_insert = getattr(comp, "complete", comp.name)
-                suggestions.append(
-                    PythonCompletionSuggestion(
-                        text=text_to_insert,
-                        displayText=display_text_value,
-                        type=comp.type,
-                    )
-                )
-        return suggestions
+        cache_key = (request_data.code, request_data.filename, jedi_line, jedi_column)
+        body = _completion_cache.get(cache_key)
+        if body is None:
+            completions = await asyncio.get_running_loop().run_in_executor(
+                JEDI_POOL, jedi_worker.complete, *cache_key
+            )
+            # Cached already encoded: a hit is just a bytes response. The
+            # dicts carry the PythonCompletionSuggestion shape (kept for docs).
+            body = orjson.dumps(completions)
+            _completion_cache[cache_key] = body
+            if len(_completion_cache) > COMPLETION_CACHE_SIZE:
+                _completion_cache.popitem(last=False)
+        else:
+            _completion_cache.move_to_end(cache_key)
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         logger.error(f"Error during Jedi completion processing: {e}", exc_info=True)
         return []
@@ -180,7 +294,9 @@ async def interrupt_python_execution(request: InterruptRequest):
     """
     serial = request.serial
     logger.info(f"Received interrupt request for serial: {serial}")
-    pid = ACTIVE_PROCESSES.get(serial)
+    # pop() claims the entry atomically: concurrent interrupts for the same
+    # serial can't both signal the process or race on a later del
+    pid = ACTIVE_PROCESSES.pop(serial, None)
 
     if pid is None:
         logger.warning(f"No active process found for serial {serial} to interrupt.")
@@ -195,28 +311,33 @@ async def interrupt_python_execution(request: InterruptRequest):
         logger.info(
             f"Successfully sent interrupt signal to PID: {pid} for serial: {serial}"
         )
-        del ACTIVE_PROCESSES[serial]
 
     except ProcessLookupError:
         logger.warning(
             f"Process with PID {pid} not found. It may have already terminated."
         )
-        if serial in ACTIVE_PROCESSES:
-            del ACTIVE_PROCESSES[serial]
     except Exception as e:
         logger.error(f"Failed to interrupt process with PID {pid}: {e}", exc_info=True)
+        # Still running as far as we know - keep it interruptible
+        ACTIVE_PROCESSES.setdefault(serial, pid)
         raise HTTPException(status_code=500, detail="Failed to stop the process.")
 
     return Response(status_code=204)
 
 
 # --- LLM Chat API Endpoint ---
+# Stop intermediaries (nginx & co.) from caching or buffering the token stream.
+SSE_HEADERS = {"cache-control": "no-cache", "x-accel-buffering": "no"}
+
+
 @app.post("/api/llm/chat")
 async def handle_llm_chat_via_service(
     client_request_data: ApiLlmChatRequest, http_request: Request
 ):
+    # ApiChatMessage was already validated by FastAPI and its fields are a
+    # subset of ChatMessageContent's, so skip the dump/re-validate roundtrip.
     service_history = [
-        ChatMessageContent.model_validate(msg.model_dump())
+        ChatMessageContent.model_construct(role=msg.role, content=msg.content)
         for msg in client_request_data.history
     ]
     service_request_data = LlmServiceChatRequest(
@@ -234,27 +355,34 @@ async def handle_llm_chat_via_service(
     return StreamingResponse(
         generate_chat_completion_stream(service_request_data),
         media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
 
 
 # --- Core API Endpoints (Info, OCR) ---
+# Nothing in the info payload changes during the process lifetime, so it is
+# serialized once instead of calling uname/getcwd and encoding per request.
+_INFO_RESPONSE_BYTES = InfoResponse(
+    version=__version__,
+    description="Local uiautodev server.",
+    platform=platform.system(),
+    code_language="Python",
+    cwd=os.getcwd(),
+    drivers=["android"],
+).model_dump_json().encode()
+
+
 @app.get("/api/info", response_model=InfoResponse)
-def get_application_info() -> InfoResponse:
-    return InfoResponse(
-        version=__version__,
-        description="Local uiautodev server.",
-        platform=platform.system(),
-        code_language="Python",
-        cwd=os.getcwd(),
-        drivers=["android"],
-    )
+async def get_application_info() -> Response:
+    return Response(content=_INFO_RESPONSE_BYTES, media_type="application/json")
 
 
 @app.post("/api/ocr_image", response_model=List[Node])
 async def perform_ocr_on_image(file: UploadFile = File(...)) -> List[Node]:
     try:
-        image_data = await file.read()
-        image = convert_bytes_to_image(image_data)
+        # UploadFile is already spooled (in memory when small, on disk when
+        # large); decode from it directly instead of buffering another copy.
+        image = convert_file_to_image(file.file)
         return ocr_image(image)
     except Exception as e:
         logger.exception("OCR image processing failed.")
@@ -270,17 +398,22 @@ async def perform_ocr_on_image(file: UploadFile = File(...)) -> List[Node]:
 
 
 # --- Service Configuration Endpoint ---
+# Constant payloads, encoded once at import (same approach as /api/info).
+_SERVICE_CONFIG_RESPONSE_BYTES = ServiceConfigResponse().model_dump_json().encode()
+_SHUTDOWN_RESPONSE_BYTES = b'{"message":"Server shutting down..."}'
+
+
 @app.get("/api/config/services", response_model=ServiceConfigResponse)
-async def get_service_configurations():
-    return ServiceConfigResponse()
+async def get_service_configurations() -> Response:
+    return Response(content=_SERVICE_CONFIG_RESPONSE_BYTES, media_type="application/json")
 
 
 # --- Server Control and Static Content ---
 @app.get("/shutdown", summary="Shutdown Server")
-def shutdown_server() -> JSONResponse:
+async def shutdown_server() -> Response:
     logger.info("Shutdown endpoint called. Sending SIGINT to process %d.", os.getpid())
     os.kill(os.getpid(), signal.SIGINT)
-    return JSONResponse(content={"message": "Server shutting down..."})
+    return Response(content=_SHUTDOWN_RESPONSE_BYTES, media_type="application/json")
 
 
 @app.get("/", summary="API Documentation", include_in_schema=False)
@@ -317,4 +450,7 @@ if __name__ == "__main__":
         port=server_port,
         reload=reload_enabled,
         log_level=log_level_str,
+        loop="uvloop",
+        http="httptools",
+        ws="none",  # No WebSocket endpoints are served by this app
     )
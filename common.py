@@ -1,7 +1,7 @@
 import io
 import locale
 import logging
-from typing import List
+from typing import BinaryIO, List
 
 from PIL import Image
 
@@ -31,6 +31,14 @@ def convert_bytes_to_image(byte_data: bytes) -> Image.Image:
     return Image.open(io.BytesIO(byte_data))
 
 
+def convert_file_to_image(fp: BinaryIO) -> Image.Image:
+    """Open an image straight from a file object, without copying it to bytes."""
+    fp.seek(0)
+    image = Image.open(fp)
+    image.load()  # Decode now; the caller may close fp right after
+    return image
+
+
 def ocr_image(image: Image.Image) -> List[OCRNode]:
     # Placeholder for OCR implementation
     w, h = image.size
@@ -1,12 +1,12 @@
 import logging
 import re
 import time
-from functools import cached_property, partial
+from functools import cached_property, lru_cache, partial
 from typing import Iterator, List, Optional, Tuple
-from xml.etree import ElementTree
 
 import adbutils
 import uiautomator2 as u2
+from lxml import etree
 from PIL import Image
 
 from command_types import CurrentAppResponse
@@ -21,6 +21,9 @@ class AndroidDriver(BaseDriver):
     def __init__(self, serial: str):
         super().__init__(serial)
         self.adb_device = adbutils.device(serial)
+        # Device metadata from the adb listing, stamped by the MCP server
+        self.model = ""
+        self.name = ""
 
     @cached_property
     def ud(self) -> u2.Device:
@@ -47,9 +50,7 @@ class AndroidDriver(BaseDriver):
 
     def dump_hierarchy(self, display_id: Optional[int] = 0) -> Tuple[str, Node]:
         """returns xml string and hierarchy object"""
-        start = time.time()
-        xml_data = self._dump_hierarchy_raw()
-        logger.debug("dump_hierarchy cost: %s", time.time() - start)
+        xml_data = self.dump_hierarchy_xml()
 
         wsize = self.adb_device.window_size()
         logger.debug("window size: %s", wsize)
@@ -57,6 +58,13 @@ class AndroidDriver(BaseDriver):
             xml_data, WindowSize(width=wsize[0], height=wsize[1]), display_id
         )
 
+    def dump_hierarchy_xml(self) -> str:
+        """returns the raw xml string only, without building the Node tree"""
+        start = time.time()
+        xml_data = self._dump_hierarchy_raw()
+        logger.debug("dump_hierarchy cost: %s", time.time() - start)
+        return xml_data
+
     def _dump_hierarchy_raw(self) -> str:
         """
         uiautomator2 server is conflict with "uiautomator dump" command.
@@ -131,10 +139,20 @@ class AndroidDriver(BaseDriver):
         yield from self.adb_device.sync.iter_content(remote_path)
 
 
+@lru_cache(maxsize=8)
+def parse_xml_root(xml_data: str) -> etree._Element:
+    """
+    Parse a hierarchy dump with lxml. Consecutive dumps of an unchanged screen
+    are byte-identical, so the parsed root is cached and shared (read-only).
+    """
+    # lxml refuses str input that carries an encoding declaration
+    return etree.fromstring(xml_data.encode("utf-8"))
+
+
 def parse_xml(
     xml_data: str, wsize: WindowSize, display_id: Optional[int] = None
 ) -> Node:
-    root = ElementTree.fromstring(xml_data)
+    root = parse_xml_root(xml_data)
     node = parse_xml_element(root, wsize, display_id)
     if node is None:
         raise AndroidDriverException("Failed to parse xml")
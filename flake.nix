@@ -186,6 +186,7 @@
             fastapi
             uvicorn
             pydantic
+            orjson
             httpx
             click
             pillow
@@ -15,28 +15,46 @@ Usage:
 """
 
 import asyncio
+import heapq
 import io
 import json
 import logging
+import multiprocessing
 import os
 import re
+import sys
 import threading
-import time as time_module
-from collections import deque
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
-from functools import lru_cache
+from functools import lru_cache, partial
+from itertools import chain, islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from time import monotonic, sleep, time_ns
+from types import MappingProxyType
+from typing import (
+    Any, AsyncIterator, Callable, Dict, List, Literal, Optional, Tuple, TypeVar, Union
+)
 
+import adbutils
+import anyio.to_thread
+import orjson
 from fastmcp import FastMCP
 from fastmcp.utilities.types import Image as MCPImage
+from lxml import etree
+from PIL import Image
 from pydantic import BaseModel, Field
+from uiautomator2.xpath import XPathError as U2XPathError, strict_xpath
 
 # Import existing UIAgent components
-from driver.android import AndroidDriver
-from model import DeviceInfo, Node, ShellResponse
+from driver.android import AndroidDriver, parse_xml, parse_xml_root
+from model import DeviceInfo, Node, ShellResponse, WindowSize
 from provider import AndroidProvider
-from utils.interactive_executor import execute_interactive_code
+from utils import script_worker
 
 # Import screen detection and navigation system
 from navigation.detector import ScreenDetector
@@ -52,10 +70,47 @@ import signatures.android_system  # noqa: F401
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Dedicated pool for blocking adb/uiautomator2 calls, sized for many parallel
+# devices, so slow device I/O never queues behind the framework's own threads
+ADB_POOL_WORKERS = 32
+_ADB_POOL = ThreadPoolExecutor(max_workers=ADB_POOL_WORKERS, thread_name_prefix="adb")
+
+# anyio's default limiter (40 tokens) is shared by everything using to_thread
+ANYIO_THREAD_TOKENS = 100
+
+T = TypeVar("T")
+
+
+async def _run_adb(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking device call on the ADB pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_ADB_POOL, partial(func, *args, **kwargs))
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+
+def _serialize_tool_result(data: Any) -> str:
+    """Encode tool results with orjson: compact, and much faster than stdlib json."""
+    return orjson.dumps(data, default=_orjson_default).decode()
+
+
+@asynccontextmanager
+async def _server_lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Raise the anyio thread limiter once the server's event loop is running."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = ANYIO_THREAD_TOKENS
+    yield
+
+
 # Initialize FastMCP server
 mcp = FastMCP(
     name="UIAgent Android Automation",
-    instructions="Control Android devices with Python scripts via uiautomator2. Use list_devices() first, then run_script() for complex automation."
+    instructions="Control Android devices with Python scripts via uiautomator2. Use list_devices() first, then run_script() for complex automation.",
+    lifespan=_server_lifespan,
+    tool_serializer=_serialize_tool_result,
 )
 
 # ============================================================================
@@ -63,24 +118,202 @@ mcp = FastMCP(
 # ============================================================================
 
 _provider: Optional[AndroidProvider] = None
-_drivers: Dict[str, AndroidDriver] = {}
+_drivers: Dict[str, Tuple[AndroidDriver, float]] = {}  # serial -> (driver, last used, monotonic)
+_drivers_lock = threading.RLock()
+DRIVER_LIVENESS_TTL = 5.0  # seconds a recently used driver is trusted without re-listing devices
+_device_tracker: Optional[threading.Thread] = None  # evicts drivers on adb disconnect
+
+# provider.list_devices() memo: the roster rarely changes between rapid calls
+DEVICE_LIST_TTL = 2.0  # seconds
+_device_list_cache: Optional[Tuple[float, List[DeviceInfo]]] = None  # (monotonic ts, devices)
+_device_list_lock = threading.Lock()
 _screen_detectors: Dict[str, ScreenDetector] = {}  # serial -> ScreenDetector
 _screen_navigators: Dict[str, ScreenNavigator] = {}  # serial -> ScreenNavigator
 
+# Compiled-XPath caches (user xpaths are usually re-polled with the same text);
+# bounded so truly dynamic queries can't grow memory without limit
+XPATH_CACHE_SIZE = 256
+# EXSLT regex functions (re:match, re:test), as uiautomator2's xpath registers
+_XPATH_NAMESPACES = {"re": "http://exslt.org/regular-expressions"}
+
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def _compile_xpath(xpath: str) -> etree.XPath:
+    """etree.XPath(xpath), compiled once per distinct expression."""
+    return etree.XPath(xpath, namespaces=_XPATH_NAMESPACES)
+
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def _strict_xpath(xpath: str) -> str:
+    """
+    Expand uiautomator2's xpath shorthand the way d.xpath() does: "@id" ->
+    resource-id, "%text%" / "text%" / "%text" -> contains / starts / ends
+    with, "^regex" -> re:match, a bare word -> exact text, desc or id.
+    Raises etree.XPathSyntaxError for invalid expressions.
+    """
+    try:
+        return strict_xpath(xpath)
+    except U2XPathError:
+        raise etree.XPathSyntaxError(f"Invalid xpath: {xpath}") from None
+
+
+_XPATH_PROBE_TREE = etree.Element("hierarchy")
+
+
+def _compile_node_xpath(xpath: str) -> etree.XPath:
+    """
+    _compile_xpath for expressions that must select nodes. An expression such
+    as boolean(...) or count(...) > 0 compiles fine but would break the
+    combined detect union on every tick, so it is rejected here.
+    """
+    compiled = _compile_xpath(xpath)
+    if not isinstance(compiled(_XPATH_PROBE_TREE), list):
+        raise etree.XPathEvalError(f"expression does not select nodes: {xpath}")
+    return compiled
+
+
+@dataclass(frozen=True)
+class PopupPattern:
+    """
+    A popup/toast pattern with its XPaths compiled once (lxml). uiautomator2
+    xpath shorthand is accepted; detect_xpath/dismiss_xpath hold the expanded
+    expressions.
+    """
+    name: str
+    detect_xpath: str
+    dismiss_xpath: str = ""
+    type: str = "popup"  # "popup" (dismiss) or "toast" (capture text only)
+    priority: int = 0  # higher is checked first
+    detect: etree.XPath = field(init=False, compare=False, repr=False)
+    dismiss: Optional[etree.XPath] = field(init=False, compare=False, repr=False)
+    # Constant part of this pattern's history records; the watcher copies it
+    record_template: MappingProxyType = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        # Raises etree.XPathSyntaxError for invalid expressions, and
+        # etree.XPathEvalError for ones that do not select nodes
+        object.__setattr__(self, "detect_xpath", _strict_xpath(self.detect_xpath))
+        if self.dismiss_xpath:
+            object.__setattr__(self, "dismiss_xpath", _strict_xpath(self.dismiss_xpath))
+        object.__setattr__(self, "detect", _compile_node_xpath(self.detect_xpath))
+        object.__setattr__(
+            self, "dismiss", _compile_node_xpath(self.dismiss_xpath) if self.dismiss_xpath else None
+        )
+        template = {"name": self.name, "type": self.type, "detect_xpath": self.detect_xpath}
+        if self.type != "toast":
+            template["dismiss_xpath"] = self.dismiss_xpath
+        object.__setattr__(self, "record_template", MappingProxyType(template))
+
+    @classmethod
+    def from_dict(cls, p: Dict[str, str], default_name: str = "unnamed") -> "PopupPattern":
+        return cls(
+            name=p.get("name") or default_name,
+            detect_xpath=p["detect_xpath"],
+            dismiss_xpath=p.get("dismiss_xpath", ""),
+            type=p.get("type", "popup"),
+            priority=int(p.get("priority", 0)),
+        )
+
+
 # Popup Management State (per-device)
-_popup_patterns: Dict[str, List[Dict[str, str]]] = {}  # serial -> [{name, detect_xpath, dismiss_xpath}]
+# serial -> compiled patterns, highest priority first (stable for equal
+# priorities); devices on the defaults share _DEFAULT_POPUP_PATTERNS.
+# Copy-on-write: writers build a new tuple under _popup_lock and rebind it,
+# so readers just load the current tuple without locking.
+_popup_patterns: Dict[str, Tuple[PopupPattern, ...]] = {}
 _popup_history: Dict[str, deque] = {}  # serial -> deque of dismissed popup records
-_popup_threads: Dict[str, threading.Thread] = {}  # serial -> watcher thread
-_popup_enabled: Dict[str, threading.Event] = {}  # serial -> stop event
+_popup_watchers: Dict[str, "_PopupWatcher"] = {}  # serial -> running watcher
 _popup_lock = threading.Lock()  # Thread safety for popup state
+# One supervisor thread schedules every device's watcher ticks from a heap of
+# (due monotonic, seq, watcher); ticks run on a small shared pool
+POPUP_TICK_WORKERS = 8
+_POPUP_TICK_POOL = ThreadPoolExecutor(max_workers=POPUP_TICK_WORKERS, thread_name_prefix="popup-tick")
+_popup_schedule: List[Tuple[float, int, "_PopupWatcher"]] = []
+_popup_schedule_seq = 0  # tie-breaker: watchers themselves aren't orderable
+_popup_schedule_cv = threading.Condition()
+_popup_supervisor: Optional[threading.Thread] = None
 MAX_POPUP_HISTORY = 100  # Ring buffer size per device
-_default_patterns_loaded = False  # Track if we've loaded default patterns
+# Watcher poll interval: POPUP_POLL_MIN right after a popup/toast, doubling on
+# each idle tick up to POPUP_POLL_MAX so idle devices are polled rarely
+POPUP_POLL_MIN = 0.1  # seconds
+POPUP_POLL_MAX = 2.0  # seconds
+# last_toast is an RPC: poll it at most every TOAST_POLL_INTERVAL, except for
+# TOAST_BURST_WINDOW after a toast, when toasts tend to come in runs
+TOAST_POLL_INTERVAL = 0.5  # seconds
+TOAST_BURST_WINDOW = 2.0  # seconds
+
+# Screenshot burst cache (per-device): back-to-back screenshot() calls within
+# the TTL share one screencap + JPEG encode. Device actions invalidate it.
+SCREENSHOT_CACHE_TTL = 0.15  # seconds
+_screenshot_cache: Dict[str, Tuple[float, bytes]] = {}  # serial -> (monotonic ts, jpeg bytes)
+_screenshot_locks: Dict[str, threading.Lock] = {}  # serial -> capture lock
+_screenshot_locks_guard = threading.Lock()
+
+# Shared hierarchy dump cache (per-device): one-shot readers (ui_hierarchy,
+# get_elements, popup_check, detect_screen) reuse a dump taken within the TTL
+# by any of them or by the popup watcher. Device actions invalidate it.
+HIERARCHY_XML_TTL = 0.5  # seconds
+_hierarchy_xml_cache: Dict[str, Tuple[float, str]] = {}  # serial -> (monotonic ts, xml)
+# serial -> screen generation, bumped by every invalidation. A capture only
+# publishes if the generation is unchanged since it started, so a dump that
+# was in flight during an action cannot repopulate the cache with the old screen.
+_screen_generation: Dict[str, int] = {}
+_screen_cache_lock = threading.Lock()  # guards generation bumps and publishes
+
+# ui_hierarchy results: (serial, xml, width, height) -> tree dict. Repeated
+# calls on an unchanged screen skip both the Node build and model_dump().
+HIERARCHY_CACHE_SIZE = 8
+_hierarchy_cache: OrderedDict = OrderedDict()
+_hierarchy_cache_lock = threading.Lock()
+
+# app_list results: (serial, filter) -> (monotonic ts, sorted packages). The
+# installed set only changes through installs/uninstalls (shell, run_script).
+APP_LIST_CACHE_TTL = 30.0  # seconds
+_app_list_cache: Dict[Tuple[str, str], Tuple[float, Tuple[str, ...]]] = {}
+
+# device_info screen size (width, height); model/name live on the driver.
+# Dropped on rotation (width/height swap) and on eviction.
+_static_device_info: Dict[str, Tuple[int, int]] = {}
+
+# run_script worker processes: serial -> single-worker pool. Scripts run out of
+# process so a timed-out script can be terminated instead of leaking a thread.
+# spawn, not fork: this process is multi-threaded (popup watchers, ADB pool).
+_script_pools: Dict[str, ProcessPoolExecutor] = {}
+_script_pools_lock = threading.Lock()
+_SCRIPT_MP_CONTEXT = multiprocessing.get_context("spawn")
 
 # Path to default popup patterns config
 POPUP_PATTERNS_FILE = Path(__file__).parent / "popup_patterns.json"
 
 
-def _load_default_patterns() -> List[Dict[str, str]]:
+def _compile_patterns(
+    raw_patterns: List[Dict[str, str]],
+    start_index: int = 0,
+    errors: Optional[List[str]] = None
+) -> List[PopupPattern]:
+    """
+    Compile raw pattern dicts, skipping entries without a valid detect_xpath.
+    Skipped invalid xpaths are described in errors, if a list is given.
+    """
+    compiled = []
+    for i, p in enumerate(raw_patterns, start_index):
+        if not p.get("detect_xpath"):
+            continue
+        try:
+            compiled.append(PopupPattern.from_dict(p, default_name=f"pattern_{i}"))
+        except etree.XPathError as e:
+            logger.warning(f"Skipping popup pattern {p.get('name', i)}: invalid xpath ({e})")
+            if errors is not None:
+                errors.append(f"{p.get('name') or f'pattern_{i}'}: invalid xpath ({e})")
+    return compiled
+
+
+def _by_priority(patterns) -> Tuple[PopupPattern, ...]:
+    """Patterns ordered highest priority first, keeping configured order on ties."""
+    return tuple(sorted(patterns, key=lambda p: -p.priority))
+
+
+def _load_default_patterns() -> List[PopupPattern]:
     """Load default popup patterns from config file."""
     if not POPUP_PATTERNS_FILE.exists():
         logger.warning(f"Popup patterns file not found: {POPUP_PATTERNS_FILE}")
@@ -89,7 +322,7 @@ def _load_default_patterns() -> List[Dict[str, str]]:
     try:
         with open(POPUP_PATTERNS_FILE, "r") as f:
             config = json.load(f)
-            patterns = config.get("patterns", [])
+            patterns = _compile_patterns(config.get("patterns", []))
             logger.info(f"Loaded {len(patterns)} default popup patterns")
             return patterns
     except Exception as e:
@@ -97,61 +330,39 @@ def _load_default_patterns() -> List[Dict[str, str]]:
         return []
 
 
+# Loaded once at import; immutable, so every device on the defaults shares it
+_DEFAULT_POPUP_PATTERNS: Tuple[PopupPattern, ...] = _by_priority(_load_default_patterns())
+
+
 def _auto_setup_popup_watcher(serial: str):
     """Auto-configure and enable popup watcher for a device on first access."""
-    global _default_patterns_loaded
-
     with _popup_lock:
         # Skip if already set up for this device
-        if serial in _popup_patterns and len(_popup_patterns[serial]) > 0:
+        if _popup_patterns.get(serial):
             return
 
-        # Load default patterns if not already loaded
-        if not _default_patterns_loaded:
-            default_patterns = _load_default_patterns()
-            _default_patterns_loaded = True
-        else:
-            # Use cached patterns structure - just copy for new device
-            # Find any existing device's patterns to copy
-            for existing_serial, patterns in _popup_patterns.items():
-                if patterns:
-                    default_patterns = patterns.copy()
-                    break
-            else:
-                default_patterns = _load_default_patterns()
-
-        if not default_patterns:
+        if not _DEFAULT_POPUP_PATTERNS:
             return
 
         # Set up patterns for this device
-        _popup_patterns[serial] = default_patterns.copy()
-        logger.info(f"[{serial}] Auto-configured {len(default_patterns)} popup patterns")
+        _popup_patterns[serial] = _DEFAULT_POPUP_PATTERNS
+        logger.info(f"[{serial}] Auto-configured {len(_DEFAULT_POPUP_PATTERNS)} popup patterns")
 
-    # Start watcher thread (outside lock to avoid deadlock)
+    # Start watcher (outside lock to avoid deadlock)
     _start_popup_watcher(serial)
 
 
 def _start_popup_watcher(serial: str):
     """Start popup watcher for a device if not already running."""
     with _popup_lock:
-        if serial in _popup_threads and _popup_threads[serial].is_alive():
+        if serial in _popup_watchers:
             return  # Already running
 
         pattern_count = len(_popup_patterns.get(serial, []))
         if pattern_count == 0:
             return  # No patterns to watch
 
-        stop_event = threading.Event()
-        _popup_enabled[serial] = stop_event
-
-        thread = threading.Thread(
-            target=_popup_watcher_loop,
-            args=(serial, stop_event),
-            daemon=True,
-            name=f"popup-watcher-{serial}"
-        )
-        thread.start()
-        _popup_threads[serial] = thread
+        _launch_popup_watcher(serial)
         logger.info(f"[{serial}] Auto-started popup watcher with {pattern_count} patterns")
 
 
@@ -163,24 +374,112 @@ def get_provider() -> AndroidProvider:
     return _provider
 
 
-@lru_cache(maxsize=16)
+def _list_devices_cached(refresh: bool = False) -> List[DeviceInfo]:
+    """provider.list_devices(), reused for DEVICE_LIST_TTL seconds."""
+    global _device_list_cache
+    now = monotonic()
+    with _device_list_lock:
+        cached = _device_list_cache
+    if not refresh and cached is not None and now - cached[0] < DEVICE_LIST_TTL:
+        return cached[1]
+
+    devices = get_provider().list_devices()
+    with _device_list_lock:
+        _device_list_cache = (now, devices)
+    return devices
+
+
+# Errors meaning the device connection itself is broken (not a tool failure).
+# Not the base AdbError: sync, install and output-parsing failures derive from
+# it too, and those leave the connection intact.
+_DEVICE_CONNECTION_ERRORS = (BrokenPipeError, ConnectionError, adbutils.AdbConnectionError)
+
+
+def _evict_on_connection_error(serial: str, error: BaseException):
+    """Drop cached handles if an error shows the device connection is gone."""
+    if isinstance(error, _DEVICE_CONNECTION_ERRORS):
+        _evict_driver(serial)
+
+
+def _evict_driver(serial: str):
+    """Forget all per-device handles for a serial (disconnected or unavailable)."""
+    global _device_list_cache
+    with _device_list_lock:
+        _device_list_cache = None
+    with _drivers_lock:
+        evicted = _drivers.pop(serial, None)
+    _screen_detectors.pop(serial, None)
+    _screen_navigators.pop(serial, None)
+    _static_device_info.pop(serial, None)
+    _invalidate_screen_caches(serial)
+    if evicted is not None:
+        # The provider memoizes drivers too; a re-plugged device needs a fresh one
+        get_provider().get_device_driver.cache_clear()
+        logger.info(f"[{serial}] Evicted cached driver")
+
+
+def _track_devices():
+    """Background thread: evict cached drivers as soon as adb reports a device gone."""
+    while True:
+        try:
+            for event in adbutils.adb.track_devices():
+                if not event.present or event.status != "device":
+                    _evict_driver(event.serial)
+        except Exception as e:
+            logger.debug(f"Device tracker error: {e}")
+        sleep(2.0)  # adb server restarted or stream ended - reconnect
+
+
+def _start_device_tracker():
+    global _device_tracker
+    with _drivers_lock:
+        if _device_tracker is None:
+            _device_tracker = threading.Thread(
+                target=_track_devices, daemon=True, name="adb-device-tracker"
+            )
+            _device_tracker.start()
+
+
 def get_driver(serial: str) -> AndroidDriver:
     """Get or create an AndroidDriver for the given device serial."""
+    now = monotonic()
+    with _drivers_lock:
+        cached = _drivers.get(serial)
+        if cached is not None and now - cached[1] < DRIVER_LIVENESS_TTL:
+            # Hot path: used moments ago, skip the adb device listing
+            _drivers[serial] = (cached[0], now)
+            return cached[0]
+
     provider = get_provider()
-    devices = provider.list_devices()
+    devices = _list_devices_cached()
 
     device = next((d for d in devices if d.serial == serial), None)
     if not device:
+        # Possibly plugged in after the roster was cached - check once more
+        devices = _list_devices_cached(refresh=True)
+        device = next((d for d in devices if d.serial == serial), None)
+    if not device:
+        _evict_driver(serial)
         available = [d.serial for d in devices]
         raise ValueError(f"Device not found: {serial}. Available: {available}")
 
     if not device.enabled:
+        _evict_driver(serial)
         raise ValueError(f"Device not available: {serial} (status: {device.status})")
 
-    driver = provider.get_device_driver(serial)
+    with _drivers_lock:
+        cached = _drivers.get(serial)
+        driver = cached[0] if cached is not None else provider.get_device_driver(serial)
+        _drivers[serial] = (driver, now)
+    if cached is None:
+        # device_info reads these instead of rescanning the device list
+        driver.model, driver.name = device.model, device.name
+
+    _start_device_tracker()
 
-    # Auto-setup popup watcher on first device access
-    _auto_setup_popup_watcher(serial)
+    if cached is None:
+        # Auto-setup popup watcher on first device access
+        _auto_setup_popup_watcher(serial)
 
     return driver
 
@@ -190,7 +489,9 @@ def get_screen_detector(serial: str) -> ScreenDetector:
     global _screen_detectors
     if serial not in _screen_detectors:
         driver = get_driver(serial)
-        _screen_detectors[serial] = ScreenDetector(driver.ud)
+        _screen_detectors[serial] = ScreenDetector(
+            driver.ud, dump_xml=partial(_dump_hierarchy_xml, serial)
+        )
     return _screen_detectors[serial]
 
 
@@ -204,6 +505,143 @@ def get_screen_navigator(serial: str, app_id: str = "instagram") -> ScreenNaviga
     return _screen_navigators[serial]
 
 
+# ============================================================================
+# UI Hierarchy Helpers (one dump, lxml-evaluated XPaths)
+# ============================================================================
+
+# eg: bounds="[883,2222][1008,2265]"
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+_UNSAFE_TAG_CHARS = re.compile(r"[^\w.\-]")
+# xpath analysis: string literals are blanked out first, then every bare word
+# that isn't an @attribute, a function call, an axis or an operator is an
+# element name test (//android.widget.Button, child::node, [Foo], ...)
+_XPATH_LITERAL = re.compile(r"'[^']*'|\"[^\"]*\"")
+_XPATH_WORD = re.compile(r"(@?)((?:[A-Za-z_][\w.\-]*:)?[A-Za-z_][\w.\-]*)\s*(\(|::)?")
+_XPATH_OPERATORS = frozenset({"and", "or", "div", "mod"})
+
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def _xpath_needs_class_tags(xpath: str) -> bool:
+    """Whether an xpath uses element names, i.e. needs the class-name retag."""
+    for at, name, call_or_axis in _XPATH_WORD.findall(_XPATH_LITERAL.sub("''", xpath)):
+        if not at and not call_or_axis and name not in _XPATH_OPERATORS:
+            return True
+    return False
+
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def _compile_limited_xpath(xpath: str) -> etree.XPath:
+    """
+    Compile an xpath once, wrapped as (xpath)[position() <= $limit]: lxml then
+    only builds Python proxies for the first $limit matches instead of every
+    match on the screen. Repeated custom get_elements queries reuse it.
+    """
+    return _compile_xpath(f"({xpath})[position() <= $limit]")
+
+
+# get_elements named filters
+_FILTER_XPATHS: Dict[str, str] = {
+    # Clickable OR checkable OR long-clickable elements
+    "interactive": "//*[@clickable='true' or @checkable='true' or @long-clickable='true']",
+    # Elements with text or content-desc
+    "text": "//*[@text!='' or @content-desc!='']",
+    # Editable text fields
+    "inputs": "//*[@class='android.widget.EditText' or contains(@class, 'EditText')]",
+    "all": "//*",
+}
+for _filter_xpath in _FILTER_XPATHS.values():
+    _compile_limited_xpath(_filter_xpath)  # warm the cache at import
+
+
+def _publish_screen_cache(cache: Dict[str, Tuple[float, Any]], serial: str, generation: int, entry) -> None:
+    """Store a capture unless the screen was invalidated since it started (generation moved on)."""
+    with _screen_cache_lock:
+        if _screen_generation.get(serial, 0) == generation:
+            cache[serial] = entry
+
+
+def _dump_hierarchy_xml(
+    serial: str, max_age: float = HIERARCHY_XML_TTL, d=None
+) -> str:
+    """
+    Dump the hierarchy XML, reusing this device's last dump if it is younger
+    than max_age (pass 0 to force a fresh dump). Fresh dumps are published to
+    the shared cache. d is an already resolved uiautomator2 device, if any.
+    """
+    if max_age > 0:
+        cached = _hierarchy_xml_cache.get(serial)
+        if cached and monotonic() - cached[0] < max_age:
+            return cached[1]
+    generation = _screen_generation.get(serial, 0)
+    dumped_at = monotonic()
+    xml_data = d.dump_hierarchy() if d is not None else get_driver(serial).dump_hierarchy_xml()
+    _publish_screen_cache(_hierarchy_xml_cache, serial, generation, (dumped_at, xml_data))
+    return xml_data
+
+
+def _xpath_root(xml_data: str, class_tags: bool = True) -> etree._Element:
+    """
+    Parse a hierarchy dump into an lxml tree whose node tags are the widget
+    class names, like uiautomator2's xpath view, so selectors such as
+    //android.widget.Button[...] work with compiled lxml XPaths.
+    Pass class_tags=False for xpaths that only use //* and attributes.
+    """
+    root = etree.fromstring(xml_data.encode("utf-8"))
+    if class_tags:
+        for node in root.iter("node"):
+            node.tag = _UNSAFE_TAG_CHARS.sub("-", node.get("class", "")) or "node"
+    return root
+
+
+def _dump_xpath_root(d, class_tags: bool = True) -> etree._Element:
+    """Fresh dump as an _xpath_root tree, for polling loops that must not reuse a cached dump."""
+    return _xpath_root(d.dump_hierarchy(), class_tags)
+
+
+def _xpath_literal(value: str) -> str:
+    """
+    Quote a string for use in an XPath 1.0 expression. XPath has no escape
+    sequences: use whichever quote the value lacks, or concat() if it has both.
+    """
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = value.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def _parse_bounds(bounds: str) -> Optional[Tuple[int, int, int, int]]:
+    """Parse a bounds attribute into (left, top, right, bottom)."""
+    m = _BOUNDS_RE.match(bounds)
+    if not m:
+        return None
+    return tuple(map(int, m.groups()))
+
+
+def _parse_bounds_batch(bounds_list: List[str]) -> List[Optional[Tuple[int, int, int, int]]]:
+    """
+    Parse many bounds attributes with a single regex scan. Every node in a
+    uiautomator dump has bounds, so this almost never needs the per-item
+    fallback (taken when some entry is missing or malformed).
+    """
+    found = _BOUNDS_RE.findall("|".join(bounds_list))
+    if len(found) != len(bounds_list):
+        return [_parse_bounds(b) for b in bounds_list]
+    ints = list(map(int, chain.from_iterable(found)))
+    return list(zip(ints[0::4], ints[1::4], ints[2::4], ints[3::4]))
+
+
+def _element_center(matches: List[etree._Element]) -> Optional[Tuple[int, int]]:
+    """Center of the first matched element's bounds, if any."""
+    for el in matches:
+        bounds = _parse_bounds(el.get("bounds", ""))
+        if bounds:
+            left, top, right, bottom = bounds
+            return (left + right) // 2, (top + bottom) // 2
+    return None
+
+
 # ============================================================================
 # Response Models
 # ============================================================================
@@ -250,7 +688,7 @@ class HierarchyResult(BaseModel):
 # ============================================================================
 
 @mcp.tool()
-def list_devices() -> List[Dict[str, Any]]:
+async def list_devices() -> List[Dict[str, Any]]:
     """
     List all connected Android devices.
 
@@ -264,8 +702,42 @@ def list_devices() -> List[Dict[str, Any]]:
         devices = list_devices()
         serial = devices[0]["serial"]  # Use this serial for other tools
     """
-    provider = get_provider()
-    devices = provider.list_devices()
+    devices = await _run_adb(_list_devices_cached, refresh=True)
+    return [d.model_dump() for d in devices]
+
+
+# ============================================================================
+# TOOL 1b: refresh_devices
+# ============================================================================
+
+def _refresh_devices() -> List[DeviceInfo]:
+    """Re-list devices and restamp model/name on the cached drivers."""
+    devices = _list_devices_cached(refresh=True)
+    by_serial = {d.serial: d for d in devices}
+    with _drivers_lock:
+        cached = list(_drivers.items())
+    for serial, (driver, _) in cached:
+        device = by_serial.get(serial)
+        if device is None or not device.enabled:
+            _evict_driver(serial)
+        else:
+            driver.model, driver.name = device.model, device.name
+    return devices
+
+
+@mcp.tool()
+async def refresh_devices() -> List[Dict[str, Any]]:
+    """
+    Re-scan connected devices and refresh cached device metadata.
+
+    Device model/name are captured when a device is first used. Call this
+    after hot-plugging or re-pairing devices so device_info reports current
+    values and handles for devices that went away are dropped.
+
+    Returns:
+        List of device info objects with serial, model, name, status, enabled
+    """
+    devices = await _run_adb(_refresh_devices)
     return [d.model_dump() for d in devices]
 
 
@@ -273,8 +745,68 @@ def list_devices() -> List[Dict[str, Any]]:
 # TOOL 2: screenshot
 # ============================================================================
 
+def _invalidate_screen_caches(serial: str):
+    """Drop the cached screenshot and hierarchy dump for a device after an action changed the screen."""
+    with _screen_cache_lock:
+        _screen_generation[serial] = _screen_generation.get(serial, 0) + 1
+        _screenshot_cache.pop(serial, None)
+        _hierarchy_xml_cache.pop(serial, None)
+
+
+def _get_cached_screenshot(serial: str) -> Optional[bytes]:
+    cached = _screenshot_cache.get(serial)
+    if cached and monotonic() - cached[0] < SCREENSHOT_CACHE_TTL:
+        return cached[1]
+    return None
+
+
+def _capture_screenshot_jpeg(serial: str) -> bytes:
+    """Capture the screen as JPEG bytes, coalescing concurrent/burst calls per device."""
+    data = _get_cached_screenshot(serial)
+    if data is not None:
+        return data
+
+    with _screenshot_locks_guard:
+        lock = _screenshot_locks.setdefault(serial, threading.Lock())
+
+    with lock:
+        # Another caller may have captured while we waited for the lock
+        data = _get_cached_screenshot(serial)
+        if data is not None:
+            return data
+
+        driver = get_driver(serial)
+        generation = _screen_generation.get(serial, 0)
+        captured_at = monotonic()
+
+        # Capture screenshot (0 = main display)
+        pil_img = driver.screenshot(0)
+
+        # Resize if needed to avoid MCP transport limits (4MB) and Claude auto-resize
+        # Target: ≤1568px on long edge (Claude's auto-resize threshold)
+        max_dimension = 1568
+        width, height = pil_img.size
+        if max(width, height) > max_dimension:
+            ratio = max_dimension / max(width, height)
+            target_size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+            # uiautomator2 hands back a lazily decoded JPEG: draft() lets libjpeg
+            # scale by 1/2, 1/4 or 1/8 while decoding (no-op for other formats)
+            pil_img.draft("RGB", target_size)
+            pil_img = pil_img.resize(target_size, Image.Resampling.BILINEAR)
+            logger.info(f"Resized screenshot to {pil_img.size}")
+
+        # Convert to JPEG bytes with reasonable compression (4:2:0, no extra
+        # optimize pass - it costs a lot of encode time for a negligible size win)
+        buf = io.BytesIO()
+        pil_img.save(buf, format="JPEG", quality=80, subsampling=2, optimize=False)
+
+        data = buf.getvalue()
+        _publish_screen_cache(_screenshot_cache, serial, generation, (captured_at, data))
+        return data
+
+
 @mcp.tool()
-def screenshot(serial: str) -> MCPImage:
+async def screenshot(serial: str) -> MCPImage:
     """
     Capture a screenshot from the Android device.
 
@@ -296,30 +828,52 @@ def screenshot(serial: str) -> MCPImage:
         image = screenshot(serial)
         # Claude can now analyze the image visually
     """
-    driver = get_driver(serial)
-
-    # Capture screenshot (0 = main display)
-    pil_img = driver.screenshot(0)
-
-    # Resize if needed to avoid MCP transport limits (4MB) and Claude auto-resize
-    # Target: ≤1568px on long edge (Claude's auto-resize threshold)
-    max_dimension = 1568
-    if max(pil_img.size) > max_dimension:
-        pil_img.thumbnail((max_dimension, max_dimension))
-        logger.info(f"Resized screenshot to {pil_img.size}")
-
-    # Convert to JPEG bytes with reasonable compression
-    buf = io.BytesIO()
-    pil_img.save(buf, format="JPEG", quality=80)
-
     # Return FastMCP Image object with correct MIME type
-    return MCPImage(data=buf.getvalue(), format="jpeg")
+    data = await _run_adb(_capture_screenshot_jpeg, serial)
+    return MCPImage(data=data, format="jpeg")
 
 
 # ============================================================================
 # TOOL 3: run_script (CORE TOOL)
 # ============================================================================
 
+def _get_script_pool(serial: str) -> ProcessPoolExecutor:
+    """Get or create the script worker process for a device."""
+    with _script_pools_lock:
+        pool = _script_pools.get(serial)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=_SCRIPT_MP_CONTEXT,
+                initializer=script_worker.init_worker,
+                initargs=(serial,),
+            )
+            _script_pools[serial] = pool
+        return pool
+
+
+def _terminate_pool_workers(pool: ProcessPoolExecutor):
+    """Kill a process pool's workers (running work included) and shut it down."""
+    if sys.version_info >= (3, 14):
+        pool.terminate_workers()  # terminates every worker, then shuts down
+        return
+    # CPython 3.8-3.13 have no public API for this: the executor keeps its
+    # workers in the private _processes dict (pid -> Process, None once shut down)
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _kill_script_pool(serial: str):
+    """Terminate a device's script worker, stopping whatever it is running."""
+    with _script_pools_lock:
+        pool = _script_pools.pop(serial, None)
+    if pool is None:
+        return
+    # Executor futures can't cancel running work - kill the worker process
+    _terminate_pool_workers(pool)
+
+
 @mcp.tool()
 async def run_script(
     serial: str,
@@ -370,24 +924,26 @@ async def run_script(
             d.xpath("//button[@text='Login']").click()
         ''')
     """
-    driver = get_driver(serial)
+    # Validates the serial (and auto-starts the popup watcher)
+    await _run_adb(get_driver, serial)
 
     # Cap timeout at 5 minutes
     effective_timeout = min(timeout_seconds, 300)
 
     try:
-        # Run blocking code in executor with timeout
-        loop = asyncio.get_event_loop()
-        result = await asyncio.wait_for(
-            loop.run_in_executor(
-                None,
-                execute_interactive_code,
+        # Run the script in the device's worker process with timeout
+        loop = asyncio.get_running_loop()
+        async with asyncio.timeout(effective_timeout):
+            result = await loop.run_in_executor(
+                _get_script_pool(serial),
+                script_worker.run,
                 code,
-                driver.ud,  # uiautomator2 device instance
-                False       # enable_tracing
-            ),
-            timeout=effective_timeout
-        )
+                False  # enable_tracing
+            )
+        _invalidate_screen_caches(serial)
+        _wake_popup_watcher(serial)
+        _invalidate_app_list(serial)
+        _static_device_info.pop(serial, None)  # scripts may rotate the screen
 
         return ScriptResult(
             stdout=result.get("stdout", ""),
@@ -397,7 +953,10 @@ async def run_script(
             debug_log=result.get("debug_log")
         )
 
-    except asyncio.TimeoutError:
+    except TimeoutError:
+        # Stop the script for real; the next run_script starts a fresh worker
+        _kill_script_pool(serial)
+        _invalidate_screen_caches(serial)
         return ScriptResult(
             stdout="",
             stderr="",
@@ -407,6 +966,10 @@ async def run_script(
             debug_log=None
         )
     except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            _kill_script_pool(serial)
+        _evict_on_connection_error(serial, e)
+        _invalidate_screen_caches(serial)
         return ScriptResult(
             stdout="",
             stderr=str(e),
@@ -420,8 +983,41 @@ async def run_script(
 # TOOL 4: ui_hierarchy
 # ============================================================================
 
+def _dump_ui_hierarchy(serial: str) -> HierarchyResult:
+    """Dump and parse the hierarchy, reusing the serialized tree for unchanged screens."""
+    driver = get_driver(serial)
+    xml_data = _dump_hierarchy_xml(serial)
+    width, height = driver.window_size()
+
+    key = (serial, xml_data, width, height)
+    with _hierarchy_cache_lock:
+        tree = _hierarchy_cache.get(key)
+        if tree is not None:
+            _hierarchy_cache.move_to_end(key)
+
+    if tree is None:
+        tree = parse_xml(xml_data, WindowSize(width=width, height=height), 0).model_dump()
+        with _hierarchy_cache_lock:
+            _hierarchy_cache[key] = tree
+            if len(_hierarchy_cache) > HIERARCHY_CACHE_SIZE:
+                _hierarchy_cache.popitem(last=False)
+
+    # Hand the parsed root (cached by parse_xml_root) to the screen detector
+    # so a following detect_screen() doesn't dump and parse the same screen
+    detector = _screen_detectors.get(serial)
+    if detector is not None:
+        detector.set_hierarchy(parse_xml_root(xml_data))
+
+    return HierarchyResult(
+        xml=xml_data,
+        tree=tree,
+        screen_width=width,
+        screen_height=height
+    )
+
+
 @mcp.tool()
-def ui_hierarchy(serial: str) -> HierarchyResult:
+async def ui_hierarchy(serial: str) -> HierarchyResult:
     """
     Get the UI element hierarchy from the device screen.
 
@@ -446,17 +1042,7 @@ def ui_hierarchy(serial: str) -> HierarchyResult:
         - clickable: Whether element accepts clicks
         - bounds: Element position [x1,y1][x2,y2]
     """
-    driver = get_driver(serial)
-
-    xml_data, tree = driver.dump_hierarchy()
-    width, height = driver.window_size()
-
-    return HierarchyResult(
-        xml=xml_data,
-        tree=tree.model_dump(),
-        screen_width=width,
-        screen_height=height
-    )
+    return await _run_adb(_dump_ui_hierarchy, serial)
 
 
 # ============================================================================
@@ -464,7 +1050,7 @@ def ui_hierarchy(serial: str) -> HierarchyResult:
 # ============================================================================
 
 @mcp.tool()
-def tap(serial: str, x: int, y: int) -> TapResult:
+async def tap(serial: str, x: int, y: int) -> TapResult:
     """
     Tap at specific screen coordinates.
 
@@ -487,10 +1073,13 @@ def tap(serial: str, x: int, y: int) -> TapResult:
         tap(serial, center_x, center_y)
     """
     try:
-        driver = get_driver(serial)
-        driver.tap(x, y)
+        driver = await _run_adb(get_driver, serial)
+        await _run_adb(driver.tap, x, y)
+        _invalidate_screen_caches(serial)
+        _wake_popup_watcher(serial)
         return TapResult(success=True, x=x, y=y)
     except Exception as e:
+        _evict_on_connection_error(serial, e)
         logger.error(f"Tap failed: {e}")
         raise ValueError(f"Tap failed at ({x}, {y}): {str(e)}")
 
@@ -500,7 +1089,7 @@ def tap(serial: str, x: int, y: int) -> TapResult:
 # ============================================================================
 
 @mcp.tool()
-def shell(serial: str, command: str) -> Dict[str, Any]:
+async def shell(serial: str, command: str) -> Dict[str, Any]:
     """
     Execute a shell command on the Android device via ADB.
 
@@ -527,11 +1116,98 @@ def shell(serial: str, command: str) -> Dict[str, Any]:
         # Check current activity
         shell(serial, "dumpsys activity activities | grep mResumedActivity")
     """
-    driver = get_driver(serial)
-    result: ShellResponse = driver.shell(command)
+    driver = await _run_adb(get_driver, serial)
+    result: ShellResponse = await _run_adb(driver.shell, command)
+    _invalidate_screen_caches(serial)
+    _wake_popup_watcher(serial)
+    _invalidate_app_list(serial)
     return result.model_dump()
 
 
+# ============================================================================
+# TOOL 6b: shell_many
+# ============================================================================
+
+SHELL_MANY_TIMEOUT = 60  # seconds for the whole batch
+
+
+def _build_shell_many_script(commands: List[str], sep: str) -> str:
+    """
+    Join commands into one shell script: each runs in its own { } group,
+    followed by a unique marker line carrying its exit status.
+    """
+    return "\n".join(f"{{ {command}\n}}; printf '\\n{sep}%d\\n' $?" for command in commands)
+
+
+def _split_shell_many_output(output: str, sep: str, commands: List[str]) -> List[Dict[str, Any]]:
+    """Split a shell_many transcript back into per-command results."""
+    results = []
+    rest = output
+    for command in commands:
+        chunk, found, rest = rest.partition(f"\n{sep}")
+        if not found:
+            # The shell died before reaching this command's marker
+            results.append({"command": command, "output": chunk.rstrip(), "error": "no result (shell exited early)"})
+            rest = ""
+            continue
+        code_str, _, rest = rest.partition("\n")
+        code = int(code_str) if code_str.isdigit() else -1
+        results.append({
+            "command": command,
+            "output": chunk.rstrip(),
+            "error": None if code == 0 else f"exit:{code}",
+        })
+    return results
+
+
+@mcp.tool()
+async def shell_many(serial: str, commands: List[str]) -> List[Dict[str, Any]]:
+    """
+    Execute several shell commands in ONE adb round-trip.
+
+    Each command runs in order in the same device shell (a failing command
+    does not stop the next one). Prefer this over repeated shell() calls
+    when gathering several properties or running a short sequence.
+
+    Args:
+        serial: Device serial number from list_devices()
+        commands: Shell command strings, run in order
+
+    Returns:
+        List of dicts (one per command) with 'command', 'output' and 'error'
+        ('error' is None on exit status 0, otherwise "exit:<code>")
+
+    Example:
+        shell_many(serial, [
+            "getprop ro.build.version.release",
+            "getprop ro.product.model",
+            "dumpsys battery | grep level",
+        ])
+    """
+    if not commands:
+        return []
+
+    driver = await _run_adb(get_driver, serial)
+
+    # Plain shell() rather than shell2(): shell2 appends "; echo <marker>:$?"
+    # to the script, which is a syntax error after a newline, and the
+    # per-command markers already carry every exit code
+    sep = f"__UIAGENT_{uuid.uuid4().hex}__"
+    script = _build_shell_many_script(commands, sep)
+
+    try:
+        output = await _run_adb(driver.adb_device.shell, script, timeout=SHELL_MANY_TIMEOUT)
+    except Exception as e:
+        _evict_on_connection_error(serial, e)
+        return [{"command": command, "output": "", "error": f"adb error: {e}"} for command in commands]
+    finally:
+        _invalidate_screen_caches(serial)
+        _invalidate_app_list(serial)
+        _wake_popup_watcher(serial)
+
+    return _split_shell_many_output(output, sep, commands)
+
+
 # ============================================================================
 # TOOL 7: device_info
 # ============================================================================
@@ -551,10 +1227,14 @@ def device_info(serial: str) -> Dict[str, Any]:
         DeviceInfoDetailed with serial, model, screen dimensions, and current app
     """
     driver = get_driver(serial)
-    provider = get_provider()
 
-    # Get screen dimensions
-    width, height = driver.window_size()
+    # Model/name were stamped on the driver and screen size is cached; only
+    # current_app is refetched
+    size = _static_device_info.get(serial)
+    if size is None:
+        size = tuple(driver.window_size())
+        _static_device_info[serial] = size
+    width, height = size
 
     # Get current app info
     current_app = None
@@ -568,14 +1248,10 @@ def device_info(serial: str) -> Dict[str, Any]:
     except Exception as e:
         logger.warning(f"Could not get current app info: {e}")
 
-    # Get device metadata
-    devices = provider.list_devices()
-    device = next((d for d in devices if d.serial == serial), None)
-
     result = DeviceInfoDetailed(
         serial=serial,
-        model=device.model if device else "",
-        name=device.name if device else "",
+        model=driver.model,
+        name=driver.name,
         screen_width=width,
         screen_height=height,
         current_app=current_app
@@ -588,12 +1264,117 @@ def device_info(serial: str) -> Dict[str, Any]:
 # TOOL 8: get_elements
 # ============================================================================
 
+def _build_selector(
+    class_name: str, resource_id: str, text: str, desc: str, center: Optional[List[int]]
+) -> str:
+    """XPath for one element: resource-id, then text, then content-desc, then class."""
+    if resource_id:
+        return f"//*[@resource-id={_xpath_literal(resource_id)}]"
+    if text:
+        return f"//*[@text={_xpath_literal(text)}]"
+    if desc:
+        return f"//*[@content-desc={_xpath_literal(desc)}]"
+    # Fall back to class with index suggestion
+    if center:
+        return f"//{class_name}  # Use tap({center[0]}, {center[1]}) for coords"
+    return f"//{class_name}"
+
+
+def _query_elements(
+    serial: str, xpath: str, max_elements: int, soa: bool, include_selector: bool = True
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """get_elements worker: one dump, matched and formatted as rows or columns."""
+    if soa:
+        selectors, texts, descs, resource_ids, types, clickables = [], [], [], [], [], []
+        bounds_flat, centers_flat = [], []
+
+    # One hierarchy dump, evaluated locally: attributes come straight from the
+    # XML instead of a per-element info round-trip
+    elements = []
+    try:
+        xpath = _strict_xpath(xpath)  # as d.xpath() would (e.g. trailing "/")
+        root = _xpath_root(_dump_hierarchy_xml(serial), _xpath_needs_class_tags(xpath))
+        matches = _compile_limited_xpath(xpath)(root, limit=max_elements)
+
+        # Parse all bounds "[l,t][r,b]" in one pass -> [x1, y1, x2, y2]
+        all_bounds = _parse_bounds_batch([el.get("bounds", "") for el in matches])
+
+        for i, (el, parsed) in enumerate(zip(matches, all_bounds)):
+            attrib = el.attrib
+
+            bounds = None
+            center = None
+            if parsed:
+                left, top, right, bottom = parsed
+                bounds = [left, top, right, bottom]
+                center = [(left + right) // 2, (top + bottom) // 2]
+
+            # Simplify class name: "android.widget.Button" -> "Button"
+            class_name = attrib.get("class", "")
+            simple_type = class_name.split(".")[-1] if class_name else "Unknown"
+
+            resource_id = attrib.get("resource-id", "")
+            text = attrib.get("text", "")
+            desc = attrib.get("content-desc", "")
+
+            short_id = resource_id.split("/")[-1] if resource_id else None  # Just the ID part
+            clickable = attrib.get("clickable") == "true"
+
+            if soa:
+                if include_selector:
+                    selectors.append(_build_selector(class_name, resource_id, text, desc, center))
+                texts.append(text or None)
+                descs.append(desc or None)
+                resource_ids.append(short_id)
+                types.append(simple_type)
+                clickables.append(clickable)
+                bounds_flat.extend(bounds or (0, 0, 0, 0))
+                centers_flat.extend(center or (0, 0))
+                continue
+
+            element = {
+                "index": i,
+                "text": text or None,
+                "desc": desc or None,
+                "resource_id": short_id,
+                "type": simple_type,
+                "bounds": bounds,
+                "clickable": clickable,
+                "center": center
+            }
+            if include_selector:
+                element["selector"] = _build_selector(class_name, resource_id, text, desc, center)
+            elements.append(element)
+
+    except Exception as e:
+        logger.error(f"get_elements failed: {e}")
+        raise ValueError(f"Failed to query elements with xpath '{xpath}': {str(e)}")
+
+    if soa:
+        columns = {
+            "count": len(types),
+            "texts": texts,
+            "descs": descs,
+            "resource_ids": resource_ids,
+            "types": types,
+            "clickables": clickables,
+            "bounds_flat": bounds_flat,
+            "centers_flat": centers_flat,
+        }
+        if include_selector:
+            columns["selectors"] = selectors
+        return columns
+    return elements
+
+
 @mcp.tool()
-def get_elements(
+async def get_elements(
     serial: str,
     filter: str = "interactive",
-    max_elements: int = 50
-) -> List[Dict[str, Any]]:
+    max_elements: int = 50,
+    format: Literal["aos", "soa"] = "aos",
+    include_selector: bool = True
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Get filtered UI elements in a Claude-consumable format.
 
@@ -607,8 +1388,22 @@ def get_elements(
             - "text": Elements with visible text or content description
             - "inputs": Editable text fields
             - "all": All elements (warning: can be large)
-            - Custom xpath: e.g., "//*[@resource-id='com.app:id/btn']"
+            - Custom xpath starting with "/" or "(": e.g.,
+              "//*[@resource-id='com.app:id/btn']". EXSLT regex functions
+              are available: "//*[re:match(@text, '^Log ?in$')]". Other
+              strings are rejected rather than read as uiautomator2
+              shorthand, so a mistyped filter name fails loudly.
         max_elements: Maximum elements to return (default: 50)
+        format: "aos" (default) returns one dict per element. "soa" returns a
+            single dict of parallel columns (keys stored once, much smaller for
+            large batches):
+            {"count": N, "selectors": [...], "texts": [...], "descs": [...],
+             "resource_ids": [...], "types": [...], "clickables": [...],
+             "bounds_flat": [x1, y1, x2, y2, ...], "centers_flat": [x, y, ...]}
+            Elements without bounds get zeros in bounds_flat/centers_flat.
+        include_selector: Build the XPath "selector" for each element (default:
+            True). Pass False when you'll act on bounds/center only; the
+            selector key (or selectors column) is then omitted.
 
     Returns:
         List of element dicts with:
@@ -642,94 +1437,46 @@ def get_elements(
         # Custom xpath - find by partial resource-id
         buttons = get_elements(serial, filter="//*[contains(@resource-id, 'btn')]")
     """
-    driver = get_driver(serial)
-    d = driver.ud  # uiautomator2 device
-
-    # Build xpath based on filter
-    if filter == "interactive":
-        # Clickable OR checkable OR focusable elements
-        xpath = "//*[@clickable='true' or @checkable='true' or @long-clickable='true']"
-    elif filter == "text":
-        # Elements with text or content-desc
-        xpath = "//*[@text!='' or @content-desc!='']"
-    elif filter == "inputs":
-        # Editable text fields
-        xpath = "//*[@class='android.widget.EditText' or contains(@class, 'EditText')]"
-    elif filter == "all":
-        xpath = "//*"
-    elif filter.startswith("/"):
+    # Resolve filter to a compiled xpath (named filters are compiled at import)
+    if filter in _FILTER_XPATHS:
+        xpath = _FILTER_XPATHS[filter]
+    elif filter.lstrip("(").startswith("/"):
         # Custom xpath
         xpath = filter
     else:
         raise ValueError(f"Unknown filter: {filter}. Use 'interactive', 'text', 'inputs', 'all', or a custom xpath.")
+    if format not in ("aos", "soa"):
+        raise ValueError(f"Unknown format: {format}. Use 'aos' or 'soa'.")
 
-    # Query elements using uiautomator2's xpath
-    elements = []
-    try:
-        matches = d.xpath(xpath).all()
-
-        for i, el in enumerate(matches[:max_elements]):
-            # Get element info
-            info = el.info
-
-            # Parse bounds dict {left, top, right, bottom} -> [x1, y1, x2, y2]
-            bounds_dict = info.get("bounds", {})
-            bounds = None
-            center = None
-            if bounds_dict and isinstance(bounds_dict, dict):
-                left = bounds_dict.get("left", 0)
-                top = bounds_dict.get("top", 0)
-                right = bounds_dict.get("right", 0)
-                bottom = bounds_dict.get("bottom", 0)
-                bounds = [left, top, right, bottom]
-                center = [(left + right) // 2, (top + bottom) // 2]
-
-            # Simplify class name: "android.widget.Button" -> "Button"
-            class_name = info.get("className", "")
-            simple_type = class_name.split(".")[-1] if class_name else "Unknown"
-
-            # Build a useful selector for this element
-            resource_id = info.get("resourceId", "")
-            text = info.get("text", "")
-            desc = info.get("contentDescription", "")
-
-            # Prefer resource-id, then text, then content-desc for selector
-            if resource_id:
-                selector = f"//*[@resource-id='{resource_id}']"
-            elif text:
-                # Escape quotes in text for xpath
-                safe_text = text.replace("'", "\\'")
-                selector = f"//*[@text='{safe_text}']"
-            elif desc:
-                safe_desc = desc.replace("'", "\\'")
-                selector = f"//*[@content-desc='{safe_desc}']"
-            else:
-                # Fall back to class with index suggestion
-                selector = f"//{class_name}  # Use tap({center[0]}, {center[1]}) for coords" if center else f"//{class_name}"
-
-            elements.append({
-                "index": i,
-                "selector": selector,
-                "text": text or None,
-                "desc": desc or None,
-                "resource_id": resource_id.split("/")[-1] if resource_id else None,  # Just the ID part
-                "type": simple_type,
-                "bounds": bounds,
-                "clickable": info.get("clickable", False),
-                "center": center
-            })
-
-    except Exception as e:
-        logger.error(f"get_elements failed: {e}")
-        raise ValueError(f"Failed to query elements with xpath '{xpath}': {str(e)}")
-
-    return elements
+    # Dump + XPath evaluation run on the ADB pool so other tool calls keep
+    # being served while this device answers
+    return await _run_adb(
+        _query_elements, serial, xpath, max_elements, format == "soa", include_selector
+    )
 
 
 # ============================================================================
 # TOOL 9: wait_for (HIGH VALUE)
 # ============================================================================
 
+def _adaptive_wait(check_fn: Callable[[], bool], timeout: float) -> bool:
+    """
+    Poll check_fn until it returns True or timeout expires. Checks immediately,
+    then backs off from 50ms to 500ms so quick transitions are caught fast
+    and long waits don't hammer the device.
+    """
+    deadline = monotonic() + timeout
+    attempt = 0
+    while True:
+        if check_fn():
+            return True
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return False
+        sleep(min(0.05 * 1.5 ** attempt, 0.5, remaining))
+        attempt += 1
+
+
 @mcp.tool()
 def wait_for(
     serial: str,
@@ -748,7 +1495,8 @@ def wait_for(
         serial: Device serial number from list_devices()
         text: Wait for this text to appear on screen
         text_gone: Wait for this text to disappear from screen
-        xpath: Wait for element matching this xpath to exist
+        xpath: Wait for element matching this xpath to exist (uiautomator2
+            shorthand works too: "Login", "@com.app:id/btn", "%partial%", "^regex")
         timeout: Max wait time in seconds (default: 10)
 
     Returns:
@@ -767,17 +1515,17 @@ def wait_for(
         # Wait for specific element
         wait_for(serial, xpath="//*[@resource-id='com.app:id/home_feed']")
     """
-    import time as time_module
     driver = get_driver(serial)
     d = driver.ud
 
-    start = time_module.time()
+    start = monotonic()
 
     try:
         if text:
-            # Wait for text to appear
-            result = d(text=text).wait(timeout=timeout)
-            elapsed = time_module.time() - start
+            # Wait for text to appear (selector existence check, no dump)
+            selector = d(text=text)
+            result = _adaptive_wait(lambda: selector.exists, timeout)
+            elapsed = monotonic() - start
             return {
                 "found": result,
                 "elapsed": round(elapsed, 2),
@@ -786,8 +1534,9 @@ def wait_for(
 
         elif text_gone:
             # Wait for text to disappear
-            result = d(text=text_gone).wait_gone(timeout=timeout)
-            elapsed = time_module.time() - start
+            selector = d(text=text_gone)
+            result = _adaptive_wait(lambda: not selector.exists, timeout)
+            elapsed = monotonic() - start
             return {
                 "found": result,
                 "elapsed": round(elapsed, 2),
@@ -795,9 +1544,16 @@ def wait_for(
             }
 
         elif xpath:
-            # Wait for xpath element to exist
-            result = d.xpath(xpath).wait(timeout=timeout)
-            elapsed = time_module.time() - start
+            # Wait for xpath element to exist (compiled once, one dump per poll).
+            # Shorthand such as "Login" or "@com.app:id/btn" is expanded first,
+            # as d.xpath() did
+            strict = _strict_xpath(xpath)
+            compiled = _compile_limited_xpath(strict)
+            class_tags = _xpath_needs_class_tags(strict)
+            result = _adaptive_wait(
+                lambda: bool(compiled(_dump_xpath_root(d, class_tags), limit=1)), timeout
+            )
+            elapsed = monotonic() - start
             return {
                 "found": result,
                 "elapsed": round(elapsed, 2),
@@ -806,7 +1562,7 @@ def wait_for(
 
         else:
             # Just wait for specified time
-            time_module.sleep(timeout)
+            sleep(timeout)
             return {
                 "found": True,
                 "elapsed": timeout,
@@ -814,7 +1570,7 @@ def wait_for(
             }
 
     except Exception as e:
-        elapsed = time_module.time() - start
+        elapsed = monotonic() - start
         return {
             "found": False,
             "elapsed": round(elapsed, 2),
@@ -826,6 +1582,15 @@ def wait_for(
 # TOOL 10: swipe (HIGH VALUE)
 # ============================================================================
 
+# Named swipe direction -> relative (start_x, start_y, end_x, end_y)
+_DIRS = {
+    "up": (0.5, 0.7, 0.5, 0.3),     # finger moves up = scroll down
+    "down": (0.5, 0.3, 0.5, 0.7),   # finger moves down = scroll up
+    "left": (0.8, 0.5, 0.2, 0.5),
+    "right": (0.2, 0.5, 0.8, 0.5),
+}
+
+
 @mcp.tool()
 def swipe(
     serial: str,
@@ -873,18 +1638,12 @@ def swipe(
     if direction:
         # Named direction swipes
         direction = direction.lower()
-        if direction == "up":
-            # Swipe up = scroll down (finger moves up)
-            d.swipe(0.5, 0.7, 0.5, 0.3, duration=duration)
-        elif direction == "down":
-            # Swipe down = scroll up (finger moves down)
-            d.swipe(0.5, 0.3, 0.5, 0.7, duration=duration)
-        elif direction == "left":
-            d.swipe(0.8, 0.5, 0.2, 0.5, duration=duration)
-        elif direction == "right":
-            d.swipe(0.2, 0.5, 0.8, 0.5, duration=duration)
-        else:
+        coords = _DIRS.get(direction)
+        if coords is None:
             raise ValueError(f"Unknown direction: {direction}. Use 'up', 'down', 'left', 'right'.")
+        d.swipe(*coords, duration=duration)
+        _invalidate_screen_caches(serial)
+        _wake_popup_watcher(serial)
 
         return {
             "success": True,
@@ -895,6 +1654,8 @@ def swipe(
     elif all(v is not None for v in [start_x, start_y, end_x, end_y]):
         # Custom coordinates
         d.swipe(start_x, start_y, end_x, end_y, duration=duration)
+        _invalidate_screen_caches(serial)
+        _wake_popup_watcher(serial)
         return {
             "success": True,
             "start": [start_x, start_y],
@@ -947,6 +1708,8 @@ def app_launch(
             d.app_start(package, activity=activity, wait=wait)
         else:
             d.app_start(package, wait=wait)
+        _invalidate_screen_caches(serial)
+        _wake_popup_watcher(serial)
 
         # Get current app info to confirm
         current = d.app_current()
@@ -958,6 +1721,7 @@ def app_launch(
             "current_activity": current.get("activity", "")
         }
     except Exception as e:
+        _evict_on_connection_error(serial, e)
         return {
             "success": False,
             "package": package,
@@ -990,12 +1754,15 @@ def app_terminate(serial: str, package: str) -> Dict[str, Any]:
 
     try:
         d.app_stop(package)
+        _invalidate_screen_caches(serial)
+        _wake_popup_watcher(serial)
         return {
             "success": True,
             "package": package,
             "message": f"Terminated {package}"
         }
     except Exception as e:
+        _evict_on_connection_error(serial, e)
         return {
             "success": False,
             "package": package,
@@ -1007,6 +1774,14 @@ def app_terminate(serial: str, package: str) -> Dict[str, Any]:
 # TOOL 13: app_list (LOW VALUE)
 # ============================================================================
 
+def _invalidate_app_list(serial: str):
+    """Drop cached app lists for a device (something may have been (un)installed)."""
+    # Snapshot the keys: app_list inserts from a worker thread concurrently
+    for key in list(_app_list_cache):
+        if key[0] == serial:
+            _app_list_cache.pop(key, None)
+
+
 @mcp.tool()
 def app_list(
     serial: str,
@@ -1032,6 +1807,11 @@ def app_list(
         # Get all apps including system
         apps = app_list(serial, filter="all")
     """
+    key = (serial, filter)
+    cached = _app_list_cache.get(key)
+    if cached and monotonic() - cached[0] < APP_LIST_CACHE_TTL:
+        return [{"package": pkg} for pkg in cached[1]]
+
     driver = get_driver(serial)
     d = driver.ud
 
@@ -1045,7 +1825,9 @@ def app_list(
         else:  # "all"
             packages = d.app_list()
 
-        return [{"package": pkg} for pkg in sorted(packages)]
+        packages = tuple(sorted(packages))
+        _app_list_cache[key] = (monotonic(), packages)
+        return [{"package": pkg} for pkg in packages]
 
     except Exception as e:
         logger.error(f"app_list failed: {e}")
@@ -1057,7 +1839,7 @@ def app_list(
 # ============================================================================
 
 @mcp.tool()
-def file_push(
+async def file_push(
     serial: str,
     local_path: str,
     remote_path: str
@@ -1076,11 +1858,12 @@ def file_push(
     Example:
         file_push(serial, "/tmp/config.json", "/sdcard/Download/config.json")
     """
-    driver = get_driver(serial)
+    driver = await _run_adb(get_driver, serial)
     d = driver.ud
 
     try:
-        d.push(local_path, remote_path)
+        # Transfers can take seconds; keep them on the ADB pool
+        await _run_adb(d.push, local_path, remote_path)
         return {
             "success": True,
             "local": local_path,
@@ -1101,7 +1884,7 @@ def file_push(
 # ============================================================================
 
 @mcp.tool()
-def file_pull(
+async def file_pull(
     serial: str,
     remote_path: str,
     local_path: str
@@ -1120,11 +1903,11 @@ def file_pull(
     Example:
         file_pull(serial, "/sdcard/screenshot.png", "/tmp/screenshot.png")
     """
-    driver = get_driver(serial)
+    driver = await _run_adb(get_driver, serial)
     d = driver.ud
 
     try:
-        d.pull(remote_path, local_path)
+        await _run_adb(d.pull, remote_path, local_path)
         return {
             "success": True,
             "remote": remote_path,
@@ -1144,6 +1927,15 @@ def file_pull(
 # TOOL 16: get_orientation (LOW VALUE)
 # ============================================================================
 
+# displayRotation (0, 1, 2, 3) -> (orientation name, degrees)
+_ROTATIONS = MappingProxyType({
+    0: ("portrait", 0),
+    1: ("landscape", 90),
+    2: ("portrait-reverse", 180),
+    3: ("landscape-reverse", 270),
+})
+
+
 @mcp.tool()
 def get_orientation(serial: str) -> Dict[str, Any]:
     """
@@ -1163,15 +1955,7 @@ def get_orientation(serial: str) -> Dict[str, Any]:
     try:
         # Get rotation (0, 1, 2, 3) -> (0°, 90°, 180°, 270°)
         rotation = d.info.get("displayRotation", 0)
-
-        orientations = {
-            0: ("portrait", 0),
-            1: ("landscape", 90),
-            2: ("portrait-reverse", 180),
-            3: ("landscape-reverse", 270)
-        }
-
-        name, degrees = orientations.get(rotation, ("unknown", rotation * 90))
+        name, degrees = _ROTATIONS.get(rotation, ("unknown", rotation * 90))
 
         return {
             "orientation": name,
@@ -1189,6 +1973,17 @@ def get_orientation(serial: str) -> Dict[str, Any]:
 # TOOL 17: set_orientation (LOW VALUE)
 # ============================================================================
 
+# Accepted orientation names -> uiautomator2 set_orientation() value
+_ORIENTATION_MAP = MappingProxyType({
+    "natural": "natural",
+    "portrait": "natural",
+    "left": "left",
+    "landscape": "left",
+    "right": "right",
+    "upsidedown": "upsidedown",
+})
+
+
 @mcp.tool()
 def set_orientation(
     serial: str,
@@ -1219,22 +2014,15 @@ def set_orientation(
     d = driver.ud
 
     orientation = orientation.lower()
-
-    orientation_map = {
-        "natural": "natural",
-        "portrait": "natural",
-        "left": "left",
-        "landscape": "left",
-        "right": "right",
-        "upsidedown": "upsidedown"
-    }
-
-    if orientation not in orientation_map:
+    target = _ORIENTATION_MAP.get(orientation)
+    if target is None:
         raise ValueError(f"Unknown orientation: {orientation}. Use: natural, portrait, landscape, left, right, upsidedown")
 
     try:
-        target = orientation_map[orientation]
         d.set_orientation(target)
+        _invalidate_screen_caches(serial)
+        _wake_popup_watcher(serial)
+        _static_device_info.pop(serial, None)  # width/height may have swapped
 
         return {
             "success": True,
@@ -1253,167 +2041,348 @@ def set_orientation(
 # POPUP MANAGEMENT SYSTEM
 # ============================================================================
 
-def _popup_watcher_loop(serial: str, stop_event: threading.Event):
-    """
-    Background thread that continuously checks for and dismisses known popups.
-    Also captures Android toasts using native toast API.
-    Records all events to history for Claude visibility.
-    """
-    logger.info(f"[{serial}] Popup watcher started")
-    _last_toast_text = None  # Track last toast to avoid duplicates
-
-    while not stop_event.is_set():
-        try:
-            with _popup_lock:
-                patterns = _popup_patterns.get(serial, [])
+@lru_cache(maxsize=16)
+def _combined_detect_xpath(patterns: Tuple[PopupPattern, ...]) -> etree.XPath:
+    """Union of all detect XPaths: one traversal answers "is any popup visible?"."""
+    if not patterns:
+        return etree.XPath("/..")  # matches nothing
+    return etree.XPath(" | ".join(f"({p.detect_xpath})" for p in patterns))
 
-            driver = get_driver(serial)
-            d = driver.ud
 
-            # ============================================================
-            # NATIVE TOAST CAPTURE - uses AccessibilityService via d.last_toast
-            # Captures real Android toasts (3500ms window for long, 2000ms for short)
-            # Uses non-blocking d.last_toast property (faster than get_message)
-            # ============================================================
-            try:
-                # Use non-blocking last_toast property instead of get_message()
-                toast_msg = getattr(d, 'last_toast', None)
-                if toast_msg and toast_msg != _last_toast_text:
-                    _last_toast_text = toast_msg
-                    logger.info(f"[{serial}] Native toast captured: {toast_msg}")
-
-                    # Record to history
-                    record = {
-                        "name": "native_toast",
-                        "type": "toast",
-                        "timestamp": datetime.now().isoformat(),
-                        "captured_text": toast_msg,
-                        "message": f"Toast: {toast_msg}"
-                    }
-
-                    with _popup_lock:
-                        if serial not in _popup_history:
-                            _popup_history[serial] = deque(maxlen=MAX_POPUP_HISTORY)
-                        _popup_history[serial].append(record)
-
-                    # Reset cache to catch next toast
-                    d.toast.reset()
-            except Exception as toast_err:
-                logger.debug(f"[{serial}] Toast capture error: {toast_err}")
-
-            if not patterns:
-                stop_event.wait(0.5)  # Sleep but wake on stop
-                continue
+@lru_cache(maxsize=16)
+def _patterns_need_class_tags(patterns: Tuple[PopupPattern, ...]) -> bool:
+    """Whether any pattern XPath names element classes (needs the retag pass)."""
+    return any(
+        _xpath_needs_class_tags(p.detect_xpath)
+        or (p.dismiss_xpath and _xpath_needs_class_tags(p.dismiss_xpath))
+        for p in patterns
+    )
 
-            # ============================================================
-            # XPATH-BASED POPUP DETECTION - for dialogs, prompts, etc.
-            # ============================================================
-            for pattern in patterns:
-                if stop_event.is_set():
-                    break
 
-                name = pattern.get("name", "unnamed")
-                detect_xpath = pattern.get("detect_xpath", "")
-                dismiss_xpath = pattern.get("dismiss_xpath", "")
+def _memo_xpath(memo: Dict[str, list], xpath: str, compiled: etree.XPath, root) -> list:
+    """Evaluate a compiled XPath once per tree: patterns sharing an xpath reuse it."""
+    matches = memo.get(xpath)
+    if matches is None:
+        matches = memo[xpath] = compiled(root)
+    return matches
+
+
+def _wait_popup_gone(
+    d, pattern: PopupPattern, timeout: float, class_tags: bool = True
+) -> Tuple[bool, etree._Element]:
+    """
+    Poll until the pattern no longer matches; returns (gone, latest root).
+    Re-checks quickly at first (most dismiss animations are short), backing
+    off from 50ms to 400ms between dumps.
+    """
+    deadline = monotonic() + timeout
+    delay = 0.05
+    while True:
+        root = _dump_xpath_root(d, class_tags)
+        if not pattern.detect(root):
+            return True, root
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return False, root
+        sleep(min(delay, remaining))
+        delay = min(0.4, delay * 1.6)
+
+
+_NATIVE_TOAST_RECORD = MappingProxyType({"name": "native_toast", "type": "toast"})
+
+
+class _PopupWatcher:
+    """
+    Per-device popup/toast watcher state. It owns no thread: the popup
+    supervisor schedules tick() on the shared tick pool. Each tick checks for
+    and dismisses known popups, captures Android toasts using the native toast
+    API, and records all events to history for Claude visibility.
+    """
+
+    def __init__(self, serial: str):
+        self.serial = serial
+        self.stop_event = threading.Event()  # kill switch: set -> never rescheduled
+        # Scheduling (guarded by _popup_schedule_cv): due time of the queued
+        # tick, None while a tick runs; heap entries with another due are stale
+        self.next_due: Optional[float] = None
+        self.woken = False  # a tool action changed the screen: poll fast again
+        self.device = None  # uiautomator2 device, reused across ticks; dropped on error
+        self.last_toast_text: Optional[str] = None  # Track last toast to avoid duplicates
+        self.toast_supported: Optional[bool] = None  # device class has last_toast
+        self.last_toast_poll = float("-inf")  # monotonic
+        self.last_toast_seen = float("-inf")  # monotonic
+        self.idle_iters = 0
+        # Check order: priority first, then most-hit patterns on this device
+        self.hits: Dict[str, int] = {}  # pattern name -> detections
+        self.ordered: Tuple[PopupPattern, ...] = ()
+        self.ordered_from: Optional[Tuple[PopupPattern, ...]] = None
+        # History records are collected during a tick and appended in one
+        # locked batch, instead of taking _popup_lock per record
+        self.pending: List[Dict[str, Any]] = []
+
+    @property
+    def active(self) -> bool:
+        return not self.stop_event.is_set()
+
+    def _flush(self):
+        if self.pending:
+            # Any new deque is allocated before taking the lock; setdefault
+            # keeps whichever deque got registered first
+            history = _popup_history.get(self.serial)
+            if history is None:
+                history = deque(maxlen=MAX_POPUP_HISTORY)
+            with _popup_lock:
+                _popup_history.setdefault(self.serial, history).extend(self.pending)
+            self.pending.clear()
+
+    def _park(self, hit: bool) -> float:
+        """Delay until the next tick: short after activity, backing off while idle."""
+        self._flush()
+        if self.woken:
+            self.woken = False
+            hit = True
+        self.idle_iters = 0 if hit else self.idle_iters + 1
+        return min(POPUP_POLL_MAX, POPUP_POLL_MIN * 2 ** min(self.idle_iters, 5))
+
+    def tick(self) -> float:
+        """Run one watcher pass; returns seconds until the next one."""
+        serial = self.serial
+        try:
+            return self._tick(serial)
+        except Exception as e:
+            self.device = None  # re-resolve through get_driver next tick
+            _evict_on_connection_error(serial, e)
+            logger.error("[%s] Popup watcher error: %s", serial, e)
+            self._flush()
+            return 2.0  # Back off on error
+
+    # Tick logging passes %-style args: messages on disabled levels are never
+    # formatted, and toast patterns can log on every fast tick while visible
+    def _tick(self, serial: str) -> float:
+        stopped = self.stop_event.is_set
+        if stopped():
+            return 0.0  # disabled while queued; won't be rescheduled
+        hit = False
+        patterns = _popup_patterns.get(serial, ())  # immutable snapshot, no lock
+        if patterns is not self.ordered_from:
+            hits = self.hits
+            self.ordered = tuple(sorted(patterns, key=lambda p: (-p.priority, -hits.get(p.name, 0))))
+            self.ordered_from = patterns
+
+        d = self.device
+        if d is None:
+            d = self.device = get_driver(serial).ud
+
+        # ============================================================
+        # NATIVE TOAST CAPTURE - uses AccessibilityService via d.last_toast
+        # Captures real Android toasts (3500ms window for long, 2000ms for short)
+        # Uses non-blocking d.last_toast property (faster than get_message)
+        # ============================================================
+        if self.toast_supported is None:
+            # Checked on the class once: no per-tick getattr, and no RPC
+            self.toast_supported = hasattr(type(d), "last_toast")
+        now = monotonic()
+        poll_toast = self.toast_supported and (
+            now - self.last_toast_seen < TOAST_BURST_WINDOW
+            or now - self.last_toast_poll >= TOAST_POLL_INTERVAL
+        )
+        try:
+            # Use non-blocking last_toast property instead of get_message()
+            toast_msg = d.last_toast if poll_toast else None
+            if poll_toast:
+                self.last_toast_poll = now
+            if (
+                toast_msg
+                and toast_msg is not self.last_toast_text
+                and toast_msg != self.last_toast_text
+            ):
+                self.last_toast_text = toast_msg
+                self.last_toast_seen = now
+                hit = True
+                logger.info("[%s] Native toast captured: %s", serial, toast_msg)
+
+                # Record to history
+                record = _NATIVE_TOAST_RECORD.copy()
+                record["timestamp_ns"] = time_ns()
+                record["captured_text"] = toast_msg
+                record["message"] = f"Toast: {toast_msg}"
+                self.pending.append(record)
+
+                # Reset cache to catch next toast
+                d.toast.reset()
+        except Exception as toast_err:
+            logger.debug("[%s] Toast capture error: %s", serial, toast_err)
+
+        if not patterns or stopped():
+            return self._park(hit)
+
+        # ============================================================
+        # XPATH-BASED POPUP DETECTION - for dialogs, prompts, etc.
+        # One hierarchy dump per tick; a single union XPath tells whether
+        # any pattern matches before the patterns are checked one by one.
+        # Pattern sets using only //* and attributes (the usual case) skip
+        # retagging every node with its class name.
+        # ============================================================
+        class_tags = _patterns_need_class_tags(patterns)
+        root = _xpath_root(_dump_hierarchy_xml(serial, 0, d), class_tags)
+        if stopped() or not _combined_detect_xpath(patterns)(root):
+            return self._park(hit)
+        hit = True
+        memo: Dict[str, list] = {}  # xpath -> matches against the current root
+
+        for pattern in self.ordered:
+            if stopped():
+                break
+
+            name = pattern.name
+            detect_xpath = pattern.detect_xpath
+            dismiss_xpath = pattern.dismiss_xpath
 
-                if not detect_xpath:
+            try:
+                # Check if popup/toast is present (quick check, no wait)
+                matches = _memo_xpath(memo, detect_xpath, pattern.detect, root)
+                if not matches:
                     continue
+                self.hits[name] = self.hits.get(name, 0) + 1
+                self.ordered_from = None  # re-rank next tick
 
-                try:
-                    # Check if popup/toast is present (quick check, no wait)
-                    if d.xpath(detect_xpath).exists:
-                        pattern_type = pattern.get("type", "popup")
-
-                        if pattern_type == "toast":
-                            # Toast handling: capture text, don't dismiss
-                            logger.info(f"[{serial}] Toast detected: {name}")
-
-                            # Try to capture toast text content
-                            captured_text = None
-                            try:
-                                el = d.xpath(detect_xpath).get()
-                                if el:
-                                    # Try multiple ways to get text
-                                    captured_text = (
-                                        el.info.get("text") or
-                                        el.info.get("contentDescription") or
-                                        el.text
-                                    )
-                            except Exception:
-                                pass
-
-                            # Record to history
-                            record = {
-                                "name": name,
-                                "type": "toast",
-                                "timestamp": datetime.now().isoformat(),
-                                "detect_xpath": detect_xpath,
-                                "captured_text": captured_text,
-                                "message": f"Toast '{name}': {captured_text}" if captured_text else f"Toast '{name}' detected"
-                            }
-
-                            with _popup_lock:
-                                if serial not in _popup_history:
-                                    _popup_history[serial] = deque(maxlen=MAX_POPUP_HISTORY)
-                                _popup_history[serial].append(record)
-
-                            logger.info(f"[{serial}] Toast captured: {name} = {captured_text}")
-
-                        else:
-                            # Popup handling: detect and dismiss
-                            logger.info(f"[{serial}] Popup detected: {name}")
-
-                            # Try to dismiss and verify it worked
-                            dismissed = False
-                            verified = False
-                            if dismiss_xpath:
-                                try:
-                                    if d.xpath(dismiss_xpath).exists:
-                                        d.xpath(dismiss_xpath).click()
-                                        dismissed = True
-                                        # Verify popup is gone (wait up to 1.5s)
-                                        verified = d.xpath(detect_xpath).wait_gone(timeout=1.5)
-                                except Exception as click_err:
-                                    logger.warning(f"[{serial}] Failed to click dismiss for {name}: {click_err}")
-
-                            # Record to history with verification status
-                            if dismissed and verified:
-                                message = f"Auto-dismissed '{name}' ✓"
-                            elif dismissed:
-                                message = f"Clicked dismiss for '{name}' but popup still visible"
-                            else:
-                                message = f"Detected '{name}' but dismiss button not found"
-
-                            record = {
-                                "name": name,
-                                "type": "popup",
-                                "timestamp": datetime.now().isoformat(),
-                                "detect_xpath": detect_xpath,
-                                "dismiss_xpath": dismiss_xpath,
-                                "dismissed": dismissed,
-                                "verified": verified,
-                                "message": message
-                            }
-
-                            with _popup_lock:
-                                if serial not in _popup_history:
-                                    _popup_history[serial] = deque(maxlen=MAX_POPUP_HISTORY)
-                                _popup_history[serial].append(record)
-
-                            logger.info(f"[{serial}] Popup handled: {name} (dismissed={dismissed})")
-
-                except Exception as e:
-                    # Don't crash watcher on individual pattern errors
-                    logger.debug(f"[{serial}] Pattern check error for {name}: {e}")
-
-            # Check every 500ms (optimized for toast capture - 3500ms window)
-            stop_event.wait(0.5)
+                if pattern.type == "toast":
+                    # Toast handling: capture text, don't dismiss
+                    logger.info("[%s] Toast detected: %s", serial, name)
 
-        except Exception as e:
-            logger.error(f"[{serial}] Popup watcher error: {e}")
-            stop_event.wait(2.0)  # Back off on error
+                    # Capture toast text content from the matched node
+                    el = matches[0]
+                    captured_text = el.get("text") or el.get("content-desc") or None
 
-    logger.info(f"[{serial}] Popup watcher stopped")
+                    # Record to history
+                    record = pattern.record_template.copy()
+                    record["timestamp_ns"] = time_ns()
+                    record["captured_text"] = captured_text
+                    record["message"] = f"Toast '{name}': {captured_text}" if captured_text else f"Toast '{name}' detected"
+                    self.pending.append(record)
+
+                    logger.info("[%s] Toast captured: %s = %s", serial, name, captured_text)
+
+                else:
+                    # Popup handling: detect and dismiss
+                    logger.info("[%s] Popup detected: %s", serial, name)
+
+                    # Try to dismiss and verify it worked
+                    dismissed = False
+                    verified = False
+                    if pattern.dismiss is not None:
+                        try:
+                            center = _element_center(
+                                _memo_xpath(memo, dismiss_xpath, pattern.dismiss, root)
+                            )
+                            if center:
+                                d.click(*center)
+                                dismissed = True
+                                _invalidate_screen_caches(serial)
+                                # Verify popup is gone (wait up to 1.5s)
+                                verified, _ = _wait_popup_gone(d, pattern, 1.5, class_tags)
+                        except Exception as click_err:
+                            logger.warning("[%s] Failed to click dismiss for %s: %s", serial, name, click_err)
+
+                    # Record to history with verification status
+                    if dismissed and verified:
+                        message = f"Auto-dismissed '{name}' ✓"
+                    elif dismissed:
+                        message = f"Clicked dismiss for '{name}' but popup still visible"
+                    else:
+                        message = f"Detected '{name}' but dismiss button not found"
+
+                    record = pattern.record_template.copy()
+                    record["timestamp_ns"] = time_ns()
+                    record["dismissed"] = dismissed
+                    record["verified"] = verified
+                    record["message"] = message
+                    self.pending.append(record)
+
+                    logger.info("[%s] Popup handled: %s (dismissed=%s)", serial, name, dismissed)
+                    if dismissed:
+                        # One popup per tick; the screen changed, and the
+                        # next (fast) tick catches anything behind it
+                        break
+
+            except Exception as e:
+                # Don't crash watcher on individual pattern errors
+                logger.debug("[%s] Pattern check error for %s: %s", serial, name, e)
+
+        return self._park(hit)
+
+
+def _schedule_popup_tick(watcher: _PopupWatcher, delay: float):
+    """Queue the watcher's next tick with the supervisor."""
+    global _popup_schedule_seq
+    with _popup_schedule_cv:
+        due = monotonic() + delay
+        watcher.next_due = due
+        _popup_schedule_seq += 1
+        heapq.heappush(_popup_schedule, (due, _popup_schedule_seq, watcher))
+        _popup_schedule_cv.notify()
+
+
+def _wake_popup_watcher(serial: str):
+    """
+    Event-driven wakeup: a tool just acted on the screen, so popups are likely.
+    Pull the device's next watcher tick forward to POPUP_POLL_MIN and make the
+    following ticks fast again, instead of waiting out an idle back-off.
+    """
+    watcher = _popup_watchers.get(serial)
+    if watcher is None:
+        return
+    with _popup_schedule_cv:  # reentrant (RLock): held across the reschedule
+        watcher.woken = True
+        due = watcher.next_due
+        if due is None:
+            return  # tick running now; it picks up woken when it parks
+        if due - monotonic() > POPUP_POLL_MIN:
+            _schedule_popup_tick(watcher, POPUP_POLL_MIN)  # queued entry goes stale
+
+
+def _run_popup_tick(watcher: _PopupWatcher):
+    delay = watcher.tick()
+    if watcher.active:
+        _schedule_popup_tick(watcher, delay)
+
+
+def _popup_supervisor_loop():
+    """
+    Single scheduler for every device's popup watcher: sleeps until the
+    earliest due tick and hands it to the tick pool, so N devices cost one
+    waiting thread instead of N threads waking on their own timers.
+    """
+    while True:
+        with _popup_schedule_cv:
+            while not _popup_schedule:
+                _popup_schedule_cv.wait()
+            due, _, watcher = _popup_schedule[0]
+            delay = due - monotonic()
+            if delay > 0:
+                _popup_schedule_cv.wait(delay)  # or until an earlier tick is queued
+                continue
+            heapq.heappop(_popup_schedule)
+            if due != watcher.next_due:
+                continue  # superseded by a wakeup
+            watcher.next_due = None  # running
+        if watcher.active:
+            _POPUP_TICK_POOL.submit(_run_popup_tick, watcher)
+
+
+def _launch_popup_watcher(serial: str) -> _PopupWatcher:
+    """Register a new watcher and schedule its first tick. Call with _popup_lock held."""
+    global _popup_supervisor
+    watcher = _PopupWatcher(serial)
+    _popup_watchers[serial] = watcher
+    if _popup_supervisor is None:
+        _popup_supervisor = threading.Thread(
+            target=_popup_supervisor_loop, daemon=True, name="popup-supervisor"
+        )
+        _popup_supervisor.start()
+    _schedule_popup_tick(watcher, 0.0)
+    logger.info(f"[{serial}] Popup watcher started")
+    return watcher
 
 
 # ============================================================================
@@ -1433,12 +2402,17 @@ def popup_configure(
         - name: Human-readable identifier (e.g., "save_login_info")
         - detect_xpath: XPath to detect popup presence
         - dismiss_xpath: XPath for element to click to dismiss
+        - priority: Optional int (default 0); higher-priority patterns are
+          checked first, and the watcher dismisses one popup per check
 
     Args:
         serial: Device serial number from list_devices()
         patterns: List of pattern dicts with name, detect_xpath, dismiss_xpath
         append: If True, add to existing patterns. If False, replace all.
 
+    XPaths are compiled here, once; patterns with an invalid XPath are skipped
+    and reported in "errors" (success is then False).
+
     Returns:
         Dict with configured pattern count
 
@@ -1456,32 +2430,27 @@ def popup_configure(
             }
         ])
     """
+    errors: List[str] = []
     with _popup_lock:
-        if serial not in _popup_patterns or not append:
-            _popup_patterns[serial] = []
+        existing = _popup_patterns.get(serial, ()) if append else ()
 
-        # Validate and add patterns
-        added = 0
-        for p in patterns:
-            if "detect_xpath" not in p:
-                continue
-
-            pattern = {
-                "name": p.get("name", f"pattern_{len(_popup_patterns[serial])}"),
-                "detect_xpath": p["detect_xpath"],
-                "dismiss_xpath": p.get("dismiss_xpath", "")
-            }
-            _popup_patterns[serial].append(pattern)
-            added += 1
+        # Validate (compile) and add patterns, kept in priority order
+        compiled = _compile_patterns(patterns, start_index=len(existing), errors=errors)
+        _popup_patterns[serial] = _by_priority([*existing, *compiled])
+        added = len(compiled)
 
         total = len(_popup_patterns[serial])
 
-    return {
-        "success": True,
+    result = {
+        "success": not errors,
         "patterns_added": added,
         "total_patterns": total,
         "message": f"Configured {total} popup patterns for {serial}"
     }
+    if errors:
+        result["errors"] = errors
+        result["message"] += f" ({len(errors)} invalid pattern(s) skipped)"
+    return result
 
 
 # ============================================================================
@@ -1493,7 +2462,7 @@ def popup_enable(serial: str) -> Dict[str, Any]:
     """
     Start automatic popup dismissal in background.
 
-    Launches a background thread that continuously monitors for configured
+    Schedules a background watcher that continuously monitors for configured
     popup patterns and dismisses them automatically. All dismissals are
     recorded to history for later review via popup_history().
 
@@ -1516,7 +2485,7 @@ def popup_enable(serial: str) -> Dict[str, Any]:
     """
     with _popup_lock:
         # Check if already running
-        if serial in _popup_threads and _popup_threads[serial].is_alive():
+        if serial in _popup_watchers:
             pattern_count = len(_popup_patterns.get(serial, []))
             return {
                 "success": True,
@@ -1534,18 +2503,7 @@ def popup_enable(serial: str) -> Dict[str, Any]:
                 "message": "No popup patterns configured. Use popup_configure() first."
             }
 
-        # Create stop event and start thread
-        stop_event = threading.Event()
-        _popup_enabled[serial] = stop_event
-
-        thread = threading.Thread(
-            target=_popup_watcher_loop,
-            args=(serial, stop_event),
-            daemon=True,
-            name=f"popup-watcher-{serial}"
-        )
-        thread.start()
-        _popup_threads[serial] = thread
+        _launch_popup_watcher(serial)
 
     return {
         "success": True,
@@ -1564,7 +2522,7 @@ def popup_disable(serial: str) -> Dict[str, Any]:
     """
     Stop automatic popup dismissal.
 
-    Stops the background watcher thread. Patterns are preserved and can
+    Stops the background watcher. Patterns are preserved and can
     be re-enabled with popup_enable(). History is also preserved.
 
     Args:
@@ -1574,27 +2532,18 @@ def popup_disable(serial: str) -> Dict[str, Any]:
         Dict with stop status
     """
     with _popup_lock:
-        if serial not in _popup_enabled:
+        watcher = _popup_watchers.pop(serial, None)
+        if watcher is None:
             return {
                 "success": True,
                 "status": "not_running",
                 "message": "Popup watcher was not running"
             }
 
-        # Signal stop
-        _popup_enabled[serial].set()
-
-        # Wait for thread to finish (with timeout)
-        if serial in _popup_threads:
-            thread = _popup_threads[serial]
-            thread.join(timeout=3.0)
-
-            if thread.is_alive():
-                logger.warning(f"[{serial}] Popup watcher thread did not stop cleanly")
-
-            del _popup_threads[serial]
-
-        del _popup_enabled[serial]
+        # Signal stop: the supervisor drops its queued tick, and a tick already
+        # running stops checking patterns and is not rescheduled
+        watcher.stop_event.set()
+        logger.info(f"[{serial}] Popup watcher stopped")
 
     return {
         "success": True,
@@ -1640,19 +2589,23 @@ def popup_history(
         # ]
     """
     with _popup_lock:
-        history = _popup_history.get(serial, deque())
+        history = _popup_history.get(serial, ())
         total = len(history)
 
         # Get newest first (reverse order), limited
-        entries = list(reversed(list(history)))[:limit]
+        records = list(islice(reversed(history), limit))
 
-        watcher_active = (
-            serial in _popup_threads and
-            _popup_threads[serial].is_alive()
-        )
+        watcher_active = serial in _popup_watchers
+
+        if clear and history:
+            history.clear()
 
-        if clear and serial in _popup_history:
-            _popup_history[serial].clear()
+    # Watcher records carry a raw timestamp_ns; format only what's returned
+    entries = []
+    for record in records:
+        entry = {k: v for k, v in record.items() if k != "timestamp_ns"}
+        entry["timestamp"] = datetime.fromtimestamp(record["timestamp_ns"] / 1e9).isoformat()
+        entries.append(entry)
 
     return {
         "entries": entries,
@@ -1689,6 +2642,7 @@ def popup_check(
         Dict with:
             - found: List of popup patterns currently visible on screen
             - checked: Number of patterns checked
+            - errors: Custom patterns skipped for an invalid xpath (only if any)
 
     Example:
         # Check configured patterns
@@ -1700,38 +2654,55 @@ def popup_check(
             {"name": "test", "detect_xpath": "//*[contains(@text, 'Error')]"}
         ])
     """
+    errors: List[str] = []
+    if patterns:
+        check_patterns = _compile_patterns(patterns, errors=errors)
+    else:
+        check_patterns = _popup_patterns.get(serial, ())
+
+    if not check_patterns:
+        # Nothing to match: skip the driver lookup and hierarchy dump
+        result = {
+            "found": [],
+            "checked": 0,
+            "any_visible": False,
+            "message": "No patterns to check"
+        }
+        if errors:
+            result["errors"] = errors
+            result["message"] = f"No valid patterns to check ({len(errors)} invalid pattern(s) skipped)"
+        return result
+
     driver = get_driver(serial)
     d = driver.ud
 
-    with _popup_lock:
-        check_patterns = patterns if patterns else _popup_patterns.get(serial, [])
-
     found = []
+    root = _xpath_root(
+        _dump_hierarchy_xml(serial, d=d), _patterns_need_class_tags(tuple(check_patterns))
+    )
 
     for pattern in check_patterns:
-        name = pattern.get("name", "unnamed")
-        detect_xpath = pattern.get("detect_xpath", "")
-
-        if not detect_xpath:
-            continue
-
         try:
-            if d.xpath(detect_xpath).exists:
+            if pattern.detect(root):
                 found.append({
-                    "name": name,
-                    "detect_xpath": detect_xpath,
-                    "dismiss_xpath": pattern.get("dismiss_xpath", ""),
+                    "name": pattern.name,
+                    "detect_xpath": pattern.detect_xpath,
+                    "dismiss_xpath": pattern.dismiss_xpath,
                     "visible": True
                 })
         except Exception as e:
-            logger.debug(f"Pattern check error for {name}: {e}")
+            logger.debug(f"Pattern check error for {pattern.name}: {e}")
 
-    return {
+    result = {
         "found": found,
         "checked": len(check_patterns),
         "any_visible": len(found) > 0,
         "message": f"Found {len(found)} popup(s) currently visible" if found else "No configured popups visible"
     }
+    if errors:
+        result["errors"] = errors
+        result["message"] += f" ({len(errors)} invalid pattern(s) skipped)"
+    return result
 
 
 # ============================================================================
@@ -2146,31 +3117,17 @@ def get_navigation_graph(
         for e in edges['edges']:
             print(f"  → {e['to_screen']} ({e['description']})")
     """
-    from navigation.graph import get_full_graph, get_outgoing_edges, WARMUP_SAFE_STATES
+    from navigation.graph import get_edge_summaries, get_graph_summary
 
     if from_screen:
-        edges = get_outgoing_edges(from_screen)
+        edges = get_edge_summaries(from_screen)
         return {
             "screen_id": from_screen,
-            "edges": [
-                {
-                    "to_screen": e.to_screen,
-                    "cost": e.cost,
-                    "reliability": e.reliability,
-                    "description": e.description,
-                    "actions_count": len(e.actions),
-                }
-                for e in edges
-            ],
+            "edges": edges,
             "edge_count": len(edges),
         }
     else:
-        graph = get_full_graph()
-        return {
-            "total_screens": len(graph),
-            "all_screens": sorted(graph.keys()),
-            "safe_states": list(WARMUP_SAFE_STATES),
-        }
+        return get_graph_summary()
 
 
 # ============================================================================
@@ -2312,9 +3269,9 @@ if __name__ == "__main__":
     logger.info("Starting UIAgent MCP Server...")
     logger.info(f"Transport: {args.transport}")
     logger.info(
-        "Available tools: list_devices, screenshot, run_script, ui_hierarchy, tap, shell, "
-        "device_info, get_elements, wait_for, swipe, app_launch, app_terminate, app_list, "
-        "file_push, file_pull, get_orientation, set_orientation, popup_configure, popup_enable, "
+        "Available tools: list_devices, refresh_devices, screenshot, run_script, ui_hierarchy, "
+        "tap, shell, shell_many, device_info, get_elements, wait_for, swipe, app_launch, "
+        "app_terminate, app_list, file_push, file_pull, get_orientation, set_orientation, popup_configure, popup_enable, "
         "popup_disable, popup_history, popup_check, detect_screen, dump_for_signature, "
         "get_screen_info, get_detection_stats, navigate_to, recover_to_safe_state, "
         "get_navigation_graph, get_navigation_stats, search_for_keyword"
@@ -20,7 +20,10 @@ from .graph import (
     NavigationEdge,
     get_full_graph,
     get_outgoing_edges,
+    get_reachable_screens,
+    get_graph_diameter,
     has_path,
+    plan,
     WARMUP_SAFE_STATES,
     LOGIN_SAFE_STATES,
     FOOTER_NAV_SCREENS,
@@ -48,7 +51,10 @@ __all__ = [
     # Graph functions
     "get_full_graph",
     "get_outgoing_edges",
+    "get_reachable_screens",
+    "get_graph_diameter",
     "has_path",
+    "plan",
     # Screen sets
     "WARMUP_SAFE_STATES",
     "LOGIN_SAFE_STATES",
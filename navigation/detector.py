@@ -6,23 +6,216 @@
 #
 # Performance target: <500ms detection with 95%+ accuracy
 
+import heapq
+import sys
 import time
 import threading
 import logging
-import xml.etree.ElementTree as ET
-from typing import Optional, Set, List, Dict, Any
+from xml.parsers import expat
+from functools import cached_property
+from itertools import chain
+from typing import Optional, Set, List, Dict, Any, Tuple, Callable
 from datetime import datetime
 
+from lxml import etree
+
 from signatures.base import (
+    SELECTOR_CLASS_SHORT,
+    SELECTOR_CONTAINS,
+    SELECTOR_CONTENT_DESC,
+    SELECTOR_GENERIC,
+    SELECTOR_ID_PART,
+    SELECTOR_OR,
+    SELECTOR_TEXT,
+    CompiledSelector,
     ScreenSignature,
     ScreenDetectionResult,
-    get_signatures_for_app,
+    SignatureIndex,
+    compile_selector,
+    get_signature_index,
     get_registry,
 )
 
 logger = logging.getLogger(__name__)
 
 
+class ElementSet(frozenset):
+    """
+    Element identifiers extracted from one hierarchy (see _ElementCollector).
+
+    Also carries every identifier lowercased and newline-joined, built on
+    first use, so a contains: selector is one C-level substring search
+    instead of lowercasing each element in Python.
+
+    The set is replaced whenever the hierarchy is refreshed, so selector
+    results are memoized on it: repeat detections within the cache TTL only
+    do dict lookups.
+    """
+
+    @cached_property
+    def lowered(self) -> str:
+        return "\n".join(self).lower()
+
+    @cached_property
+    def selector_memo(self) -> Dict[str, bool]:
+        return {}
+
+
+class _ElementCollector:
+    """
+    Collects element identifiers from hierarchy nodes, one start() per node.
+
+    start() has the expat StartElementHandler signature, so a raw dump can be
+    streamed through it without building a tree, and also accepts lxml
+    elements (which share the attrs.get() API) for an already parsed tree.
+
+    element_set() builds the normalized identifiers used for matching:
+    - resource-id:com.instagram.android:id/search_bar
+    - id:search_bar (just the ID part for clone-safe matching)
+    - content-desc:Like
+    - text:Your story
+    - class-short:VideoView
+
+    Selectors only ever look those up, so by default that is all it builds.
+    With full=True (dump_for_signature) it also adds class:, clickable:,
+    clickable-text: and the -lower variants of content-desc/text.
+    """
+
+    def __init__(self, full: bool = False):
+        self.full = full
+        # Raw attribute values: screens repeat the same ids, classes and
+        # labels many times, so each token is formatted once per value
+        self.resource_ids: Set[Optional[str]] = set()
+        self.content_descs: Set[Optional[str]] = set()
+        self.texts: Set[Optional[str]] = set()
+        self.class_names: Set[Optional[str]] = set()
+        self.clickable_descs: Set[Optional[str]] = set()
+        self.clickable_texts: Set[Optional[str]] = set()
+        if full:
+            self.start = self._start_full
+
+    def start(self, name: str, attrs) -> None:
+        get = attrs.get
+        self.resource_ids.add(get("resource-id"))
+        self.content_descs.add(get("content-desc"))
+        self.texts.add(get("text"))
+        self.class_names.add(get("class"))
+
+    def _start_full(self, name: str, attrs) -> None:
+        get = attrs.get
+        self.resource_ids.add(get("resource-id"))
+        content_desc = get("content-desc")
+        self.content_descs.add(content_desc)
+        text = get("text")
+        self.texts.add(text)
+        self.class_names.add(get("class"))
+        if get("clickable") == "true":
+            self.clickable_descs.add(content_desc)
+            self.clickable_texts.add(text)
+
+    def element_set(self) -> ElementSet:
+        # Tokens from the closed vocabularies signatures select on (ids,
+        # descriptions, classes) are interned like the compiled selectors, so
+        # the selector lookups mostly hit on identity
+        elements = set()
+        add = elements.add
+        intern = sys.intern
+
+        for resource_id in self.resource_ids:
+            if resource_id:
+                add(f"resource-id:{resource_id}")
+                # Also add just the ID part (after :id/) for clone-safe matching
+                if ":id/" in resource_id:
+                    add(intern(f"id:{resource_id.split(':id/')[-1]}"))
+
+        full = self.full
+
+        for content_desc in self.content_descs:
+            if content_desc:
+                add(intern(f"content-desc:{content_desc}"))
+                if full:
+                    add(f"content-desc-lower:{content_desc.lower()}")
+
+        for text in self.texts:
+            if text:
+                add(f"text:{text}")
+                if full:
+                    add(f"text-lower:{text.lower()}")
+
+        for class_name in self.class_names:
+            if class_name:
+                if full:
+                    add(f"class:{class_name}")
+                if "." in class_name:
+                    add(intern(f"class-short:{class_name.split('.')[-1]}"))
+
+        # Clickable elements (only collected when full)
+        for content_desc in self.clickable_descs:
+            if content_desc:
+                add(f"clickable:{content_desc}")
+        for text in self.clickable_texts:
+            if text:
+                add(f"clickable-text:{text}")
+
+        return ElementSet(elements)
+
+
+def _stream_elements(xml_str: str, full: bool = False) -> ElementSet:
+    """Extract the element set straight from a hierarchy dump with expat (no tree)."""
+    collector = _ElementCollector(full)
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = collector.start
+    parser.Parse(xml_str, True)
+    return collector.element_set()
+
+
+# Matchers for compiled selectors, dispatched by CompiledSelector.kind
+
+def _match_id_part(compiled: CompiledSelector, elements: Set[str]) -> bool:
+    # Resource-id match - CLONE SAFE! Any package, just the :id/xxx part
+    token, needle = compiled.subterms
+    if token in elements:
+        return True
+    for elem in elements:
+        if elem.startswith("resource-id:") and needle in elem:
+            return True
+    return False
+
+
+def _match_exact(compiled: CompiledSelector, elements: Set[str]) -> bool:
+    return compiled.key in elements
+
+
+def _match_contains(compiled: CompiledSelector, elements: Set[str]) -> bool:
+    search_text = compiled.key
+    # A newline-free needle can't span two joined elements
+    if isinstance(elements, ElementSet) and "\n" not in search_text:
+        return search_text in elements.lowered
+    for elem in elements:
+        if search_text in elem.lower():
+            return True
+    return False
+
+
+def _match_or(compiled: CompiledSelector, elements: Set[str]) -> bool:
+    return any(_MATCHERS[part.kind](part, elements) for part in compiled.subterms)
+
+
+def _match_generic(compiled: CompiledSelector, elements: Set[str]) -> bool:
+    return any(token in elements for token in compiled.subterms)
+
+
+_MATCHERS = {
+    SELECTOR_ID_PART: _match_id_part,
+    SELECTOR_CONTENT_DESC: _match_exact,
+    SELECTOR_TEXT: _match_exact,
+    SELECTOR_CLASS_SHORT: _match_exact,
+    SELECTOR_CONTAINS: _match_contains,
+    SELECTOR_OR: _match_or,
+    SELECTOR_GENERIC: _match_generic,
+}
+
+
 class ScreenDetector:
     """
     Fast screen detection using parallel signature matching.
@@ -42,20 +235,32 @@ class ScreenDetector:
     # Cache settings
     CACHE_TTL_MS = 500  # UI dump valid for 500ms
 
-    def __init__(self, device):
+    # Re-check the previous winner alone first; keep it if it scores this high
+    # and nothing that could outrank it (see _selectors_ahead) matches
+    STICKY_CONFIDENCE = 0.95
+
+    def __init__(self, device, dump_xml: Optional[Callable[[float], str]] = None):
         """
         Initialize the screen detector.
 
         Args:
             device: uiautomator2 device instance
+            dump_xml: Optional hierarchy source taking a max age in seconds
+                (0 = must be fresh), e.g. a dump cache shared with other
+                tools. Defaults to device.dump_hierarchy().
         """
         self.device = device
+        self._dump_xml = dump_xml or (lambda max_age: device.dump_hierarchy())
         self._lock = threading.RLock()
 
         # UI hierarchy cache
-        self._cached_hierarchy: Optional[ET.Element] = None
+        self._cached_hierarchy: Optional[etree._Element] = None
         self._cache_timestamp: float = 0
-        self._cached_elements: Set[str] = set()
+        self._cached_elements: ElementSet = ElementSet()
+
+        # Previous winner as (index it was scored in, signature,
+        # _selectors_ahead of it)
+        self._last_winner: Optional[Tuple[SignatureIndex, ScreenSignature, Tuple[str, ...]]] = None
 
         # Detection metrics
         self._detection_count = 0
@@ -82,9 +287,9 @@ class ScreenDetector:
         start_time = time.time()
 
         try:
-            # Step 1: Get UI hierarchy (cached or fresh)
-            hierarchy = self._get_ui_hierarchy(force_refresh)
-            if hierarchy is None:
+            # Step 1: Get UI elements (cached or from a fresh dump)
+            elements = self._get_elements(force_refresh)
+            if elements is None:
                 return ScreenDetectionResult(
                     app_id=app_id,
                     screen_id="unknown",
@@ -93,12 +298,9 @@ class ScreenDetector:
                     error="Failed to dump UI hierarchy",
                 )
 
-            # Step 2: Extract elements from hierarchy
-            elements = self._extract_elements(hierarchy)
-
-            # Step 3: Get signatures for this app
-            signatures = get_signatures_for_app(app_id, include_system)
-            if not signatures:
+            # Step 2: Get signatures for this app (with their selector index)
+            index = get_signature_index(app_id, include_system)
+            if not index.signatures:
                 return ScreenDetectionResult(
                     app_id=app_id,
                     screen_id="unknown",
@@ -107,22 +309,35 @@ class ScreenDetector:
                     error=f"No signatures registered for app: {app_id}",
                 )
 
-            # Step 4: Score all signatures
-            scores: Dict[str, tuple[float, ScreenSignature]] = {}
-            matched_elements_map: Dict[str, List[str]] = {}
+            # Step 3: Sticky fast path - consecutive detections usually land
+            # on the same screen, so re-score only the previous winner first.
+            # A dialog/overlay over it shows up as a higher-priority hit.
+            last = self._last_winner
+            if last is not None and last[0] is index:
+                _, sig, ahead = last
+                hits = {
+                    selector
+                    for selector in chain(sig.unique, sig.required, sig.forbidden, sig.optional)
+                    if self._selector_matches(selector, elements)
+                }
+                score, matched = self._score_signature(sig, hits)
+                if score >= self.STICKY_CONFIDENCE and not any(
+                    self._selector_matches(selector, elements) for selector in ahead
+                ):
+                    detection_time_ms = self._record_detection(start_time)
+                    return self._winner_result(
+                        sig, score, matched, detection_time_ms, [(sig.screen_id, score)]
+                    )
 
-            for sig in signatures:
-                score, matched = self._score_signature(sig, elements)
-                if score > 0:
-                    scores[sig.screen_id] = (score, sig)
-                    matched_elements_map[sig.screen_id] = matched
+            # Step 4: Score all signatures (each distinct selector checked once)
+            element_mask = self._element_mask(index, elements)
+            scores = self._score_signatures(index, element_mask)
 
             # Step 5: Determine winner
-            detection_time_ms = (time.time() - start_time) * 1000
-            self._detection_count += 1
-            self._total_detection_time_ms += detection_time_ms
+            detection_time_ms = self._record_detection(start_time)
 
             if not scores:
+                self._last_winner = None
                 self._unknown_count += 1
                 self._log_unknown_screen(elements, app_id)
                 return ScreenDetectionResult(
@@ -132,35 +347,30 @@ class ScreenDetector:
                     detection_time_ms=detection_time_ms,
                 )
 
-            # Sort by score descending
-            sorted_scores = sorted(
-                scores.items(),
-                key=lambda x: x[1][0],
-                reverse=True
+            # Top 5 by score descending (ties keep priority order, like sorted)
+            top_scores = heapq.nlargest(5, scores.items(), key=lambda x: x[1][0])
+            winner_id, (winner_score, winner_sig) = top_scores[0]
+            _, winner_matched = self._score_signature(
+                winner_sig, index.selectors_in(element_mask)
             )
-            winner_id, (winner_score, winner_sig) = sorted_scores[0]
+            if last is None or last[0] is not index or last[1] is not winner_sig:
+                self._last_winner = (index, winner_sig, self._selectors_ahead(index, winner_sig))
 
             # Log close matches for debugging
-            if len(sorted_scores) > 1:
-                second_id, (second_score, _) = sorted_scores[1]
+            if len(top_scores) > 1:
+                second_id, (second_score, _) = top_scores[1]
                 if winner_score - second_score < 0.1:
                     logger.debug(
                         f"Close match: {winner_id}={winner_score:.2f} vs "
                         f"{second_id}={second_score:.2f}"
                     )
 
-            return ScreenDetectionResult(
-                app_id=winner_sig.app_id,
-                screen_id=winner_id,
-                confidence=winner_score,
-                detection_time_ms=detection_time_ms,
-                matched_elements=matched_elements_map.get(winner_id, []),
-                candidates=[
-                    (sid, score) for sid, (score, _) in sorted_scores[:5]
-                ],
-                description=winner_sig.description,
-                is_safe_state=winner_sig.is_safe_state,
-                recovery_action=winner_sig.recovery_action,
+            return self._winner_result(
+                winner_sig,
+                winner_score,
+                winner_matched,
+                detection_time_ms,
+                [(sid, score) for sid, (score, _) in top_scores],
             )
 
         except Exception as e:
@@ -174,97 +384,162 @@ class ScreenDetector:
                 error=str(e),
             )
 
-    def _get_ui_hierarchy(self, force_refresh: bool = False) -> Optional[ET.Element]:
-        """Get UI hierarchy with caching."""
+    def _record_detection(self, start_time: float) -> float:
+        """Add a completed detection to the metrics; returns its duration in ms."""
+        detection_time_ms = (time.time() - start_time) * 1000
+        self._detection_count += 1
+        self._total_detection_time_ms += detection_time_ms
+        return detection_time_ms
+
+    @staticmethod
+    def _selectors_ahead(index: SignatureIndex, sig: ScreenSignature) -> Tuple[str, ...]:
+        """
+        Distinct unique and required selectors of the signatures ranked before
+        sig in index. Those signatures win ties, and can only reach the sticky
+        confidence through a unique or required hit.
+        """
+        ahead: Dict[str, None] = {}
+        for other in index.signatures:
+            if other is sig:
+                break
+            ahead.update(dict.fromkeys(other.unique))
+            ahead.update(dict.fromkeys(other.required))
+        return tuple(ahead)
+
+    @staticmethod
+    def _winner_result(
+        sig: ScreenSignature,
+        score: float,
+        matched: List[str],
+        detection_time_ms: float,
+        candidates: List[tuple],
+    ) -> ScreenDetectionResult:
+        return ScreenDetectionResult(
+            app_id=sig.app_id,
+            screen_id=sig.screen_id,
+            confidence=score,
+            detection_time_ms=detection_time_ms,
+            matched_elements=matched,
+            candidates=candidates,
+            description=sig.description,
+            is_safe_state=sig.is_safe_state,
+            recovery_action=sig.recovery_action,
+        )
+
+    def _get_elements(
+        self, force_refresh: bool = False, full: bool = False
+    ) -> Optional[ElementSet]:
+        """
+        Get the current screen's element set with caching.
+
+        Fresh dumps are streamed through expat into the element set without
+        building a tree; a hierarchy seeded by set_hierarchy() is walked once.
+        full=True (with force_refresh) builds every token kind, see
+        _ElementCollector.
+        """
         with self._lock:
             now_ms = time.time() * 1000
 
             # Return cached if valid and not forcing refresh
             if (
                 not force_refresh
-                and self._cached_hierarchy is not None
+                and (self._cached_elements or self._cached_hierarchy is not None)
                 and (now_ms - self._cache_timestamp) < self.CACHE_TTL_MS
             ):
-                return self._cached_hierarchy
+                if self._cached_elements:
+                    return self._cached_elements
+                return self._extract_elements(self._cached_hierarchy)
 
             # Dump fresh hierarchy
             try:
-                xml_str = self.device.dump_hierarchy()
-                self._cached_hierarchy = ET.fromstring(xml_str)
+                xml_str = self._dump_xml(0 if force_refresh else self.CACHE_TTL_MS / 1000)
+                self._cached_hierarchy = None
+                self._cached_elements = _stream_elements(xml_str, full)
                 self._cache_timestamp = now_ms
-                self._cached_elements = set()  # Clear element cache
-                return self._cached_hierarchy
+                return self._cached_elements
             except Exception as e:
                 logger.error(f"UI dump failed: {e}")
                 return None
 
-    def _extract_elements(self, hierarchy: ET.Element) -> Set[str]:
+    def _extract_elements(self, hierarchy: etree._Element) -> ElementSet:
         """
-        Extract all identifiable elements from UI hierarchy.
-
-        Builds a set of normalized identifiers for fast matching:
-        - resource-id:com.instagram.android:id/search_bar
-        - id:search_bar (just the ID part for clone-safe matching)
-        - content-desc:Like
-        - text:Your story
-        - class-short:VideoView
+        Extract all identifiable elements from a parsed UI hierarchy
+        (see _ElementCollector for the identifier formats).
 
         Returns:
-            Set of element identifier strings
+            ElementSet of element identifier strings
         """
         # Use cached if available
         if self._cached_elements:
             return self._cached_elements
 
-        elements = set()
-
+        # lxml elements have the same get() as expat's attribute dicts
+        collector = _ElementCollector()
+        start = collector.start
         for node in hierarchy.iter():
-            attribs = node.attrib
-
-            # Resource ID
-            resource_id = attribs.get("resource-id", "")
-            if resource_id:
-                elements.add(f"resource-id:{resource_id}")
-                # Also add just the ID part (after :id/) for clone-safe matching
-                if ":id/" in resource_id:
-                    elements.add(f"id:{resource_id.split(':id/')[-1]}")
-
-            # Content description
-            content_desc = attribs.get("content-desc", "")
-            if content_desc:
-                elements.add(f"content-desc:{content_desc}")
-                elements.add(f"content-desc-lower:{content_desc.lower()}")
-
-            # Text
-            text = attribs.get("text", "")
-            if text:
-                elements.add(f"text:{text}")
-                elements.add(f"text-lower:{text.lower()}")
-
-            # Class name
-            class_name = attribs.get("class", "")
-            if class_name:
-                elements.add(f"class:{class_name}")
-                if "." in class_name:
-                    elements.add(f"class-short:{class_name.split('.')[-1]}")
+            start(node.tag, node)
+
+        self._cached_elements = collector.element_set()
+        return self._cached_elements
+
+    def _element_mask(self, index: SignatureIndex, elements: Set[str]) -> int:
+        """Evaluate every distinct selector in the index once into a bitmask of matches."""
+        match = self._match_compiled
+        memo = elements.selector_memo if isinstance(elements, ElementSet) else {}
+        element_mask = 0
+        for position, (selector, compiled) in enumerate(zip(index.selectors, index.compiled)):
+            matched = memo.get(selector)
+            if matched is None:
+                matched = memo[selector] = match(compiled, elements)
+            if matched:
+                element_mask |= 1 << position
+        return element_mask
+
+    def _score_signatures(
+        self,
+        index: SignatureIndex,
+        element_mask: int
+    ) -> Dict[str, Tuple[float, ScreenSignature]]:
+        """
+        Score all indexed signatures against the matched-selector bitmask.
 
-            # Clickable elements
-            if attribs.get("clickable") == "true":
-                if content_desc:
-                    elements.add(f"clickable:{content_desc}")
-                if text:
-                    elements.add(f"clickable-text:{text}")
+        Applies the _score_signature rules with integer AND + bit_count on
+        each signature's masks.
 
-        self._cached_elements = elements
-        return elements
+        Returns:
+            screen_id -> (score, signature) for signatures scoring above 0
+        """
+        scores: Dict[str, Tuple[float, ScreenSignature]] = {}
+        for sig, masks in zip(index.signatures, index.masks):
+            if masks.forbidden & element_mask:
+                continue  # Disqualified (also overrides a unique match)
+            if masks.unique & element_mask:
+                score = 1.0
+            else:
+                if masks.required:
+                    required_matches = (masks.required & element_mask).bit_count()
+                    if not required_matches:
+                        continue  # Must match at least one required
+                    base_score = required_matches / masks.required_count
+                else:
+                    base_score = 0.5  # No required = partial match
+                if masks.optional:
+                    optional_matches = (masks.optional & element_mask).bit_count()
+                    optional_boost = 0.1 * (optional_matches / masks.optional_count)
+                else:
+                    optional_boost = 0.0
+                score = min(1.0, base_score + optional_boost)
+            if score > 0:
+                scores[sig.screen_id] = (score, sig)
+        return scores
 
     def _score_signature(
         self,
         signature: ScreenSignature,
-        elements: Set[str]
+        hits: Set[str]
     ) -> tuple[float, List[str]]:
         """
-        Calculate how well elements match a signature.
+        Calculate how well a signature matches, given the matching selectors.
 
         Scoring:
         - Unique match: 1.0 (instant win, but check forbidden)
@@ -279,23 +554,23 @@ class ScreenDetector:
 
         # Check unique identifiers first (fast path)
         for unique in signature.unique:
-            if self._selector_matches(unique, elements):
+            if unique in hits:
                 # Unique match - but still check forbidden
                 for forbidden in signature.forbidden:
-                    if self._selector_matches(forbidden, elements):
+                    if forbidden in hits:
                         return (0.0, [])  # Disqualified
                 matched.append(f"unique:{unique}")
                 return (1.0, matched)
 
         # Check forbidden elements (disqualifies)
         for forbidden in signature.forbidden:
-            if self._selector_matches(forbidden, elements):
+            if forbidden in hits:
                 return (0.0, [])
 
         # Count required matches
         required_matches = 0
         for required in signature.required:
-            if self._selector_matches(required, elements):
+            if required in hits:
                 required_matches += 1
                 matched.append(f"required:{required}")
 
@@ -312,7 +587,7 @@ class ScreenDetector:
         # Optional element boost (max 0.1)
         optional_matches = 0
         for optional in signature.optional:
-            if self._selector_matches(optional, elements):
+            if optional in hits:
                 optional_matches += 1
                 matched.append(f"optional:{optional}")
 
@@ -336,58 +611,18 @@ class ScreenDetector:
         - Like OR Unlike -> either matches
         - contains:Reel by -> substring search
         """
-        # Handle OR conditions (e.g., "Like OR Unlike")
-        if " OR " in selector:
-            parts = selector.split(" OR ")
-            return any(self._selector_matches(part.strip(), elements) for part in parts)
-
-        # Handle contains syntax (e.g., "contains:Reel by")
-        if selector.startswith("contains:"):
-            search_text = selector[9:].lower()
-            for elem in elements:
-                if search_text in elem.lower():
-                    return True
-            return False
-
-        # Resource-id match - CLONE SAFE!
-        # Matches any package name, just looks for the :id/xxx part
-        if ":id/" in selector:
-            id_part = selector.split(":id/")[-1]
-            for elem in elements:
-                if elem.startswith("resource-id:") and f":id/{id_part}" in elem:
-                    return True
-                if elem.startswith("id:") and elem == f"id:{id_part}":
-                    return True
-            return False
-
-        # Short id format (e.g., "id:action_bar_search_edit_text")
-        if selector.startswith("id:"):
-            id_part = selector[3:]
-            for elem in elements:
-                if elem.startswith("resource-id:") and f":id/{id_part}" in elem:
-                    return True
-                if elem == selector:
-                    return True
-            return False
-
-        # Content description match
-        if selector.startswith("content-desc:"):
-            return selector in elements
-
-        # Text match
-        if selector.startswith("text:"):
-            return selector in elements
-
-        # Class match (short name like VideoView)
-        if selector[0].isupper() and ":" not in selector:
-            return f"class-short:{selector}" in elements
-
-        # Generic match - try multiple formats
-        return (
-            f"content-desc:{selector}" in elements
-            or f"text:{selector}" in elements
-            or f"id:{selector}" in elements
-        )
+        if not isinstance(elements, ElementSet):
+            return self._match_compiled(compile_selector(selector), elements)
+        memo = elements.selector_memo
+        matched = memo.get(selector)
+        if matched is None:
+            matched = memo[selector] = self._match_compiled(compile_selector(selector), elements)
+        return matched
+
+    @staticmethod
+    def _match_compiled(compiled: CompiledSelector, elements: Set[str]) -> bool:
+        """Check a pre-parsed selector against the element set."""
+        return _MATCHERS[compiled.kind](compiled, elements)
 
     def _log_unknown_screen(self, elements: Set[str], app_id: str) -> None:
         """Log details about an unknown screen for debugging."""
@@ -402,11 +637,21 @@ class ScreenDetector:
             f"  texts: {texts[:5]}"
         )
 
+    def set_hierarchy(self, hierarchy: etree._Element) -> None:
+        """
+        Seed the cache with a hierarchy that was already dumped and parsed
+        elsewhere (e.g. by ui_hierarchy), so the next detection skips its own dump.
+        """
+        with self._lock:
+            self._cached_hierarchy = hierarchy
+            self._cached_elements = ElementSet()
+            self._cache_timestamp = time.time() * 1000
+
     def invalidate_cache(self) -> None:
         """Force cache invalidation."""
         with self._lock:
             self._cached_hierarchy = None
-            self._cached_elements = set()
+            self._cached_elements = ElementSet()
             self._cache_timestamp = 0
 
     def get_stats(self) -> Dict[str, Any]:
@@ -438,12 +683,10 @@ class ScreenDetector:
         Returns:
             Dict with all extracted elements organized by type
         """
-        hierarchy = self._get_ui_hierarchy(force_refresh=True)
-        if hierarchy is None:
+        elements = self._get_elements(force_refresh=True, full=True)
+        if elements is None:
             return {"error": "Failed to dump hierarchy"}
 
-        elements = self._extract_elements(hierarchy)
-
         return {
             "timestamp": datetime.now().isoformat(),
             "resource_ids": sorted([e[3:] for e in elements if e.startswith("id:")]),
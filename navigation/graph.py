@@ -7,9 +7,15 @@
 # - NavigationEdge: Transition between two screens
 # - Graph definitions: LOGIN_FLOW_GRAPH, MAIN_APP_GRAPH
 
+import heapq
+import math
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional, Set, Dict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Set, Dict, Tuple
+
+from lxml import etree
 
 
 class ActionType(str, Enum):
@@ -25,20 +31,22 @@ class ActionType(str, Enum):
     LAUNCH_APP = "launch_app"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NavigationAction:
     """A single action in a navigation sequence."""
     action_type: ActionType
     target: Optional[str] = None
     wait_after: float = 1.0
     description: str = ""
+    # CLICK_ELEMENT: target compiled once at graph build (target keeps the source)
+    xpath: Optional[etree.XPath] = field(default=None, compare=False, repr=False)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NavigationEdge:
     """An edge in the navigation graph - transition between screens."""
     to_screen: str  # Screen ID (e.g., "explore_grid", "home_feed")
-    actions: List[NavigationAction]
+    actions: Tuple[NavigationAction, ...]
     cost: float = 1.0
     reliability: float = 0.95
     description: str = ""
@@ -47,7 +55,11 @@ class NavigationEdge:
 # =============================================================================
 # Helper functions for building graph
 # =============================================================================
+# NavigationAction is frozen, so the factories are memoized: the many
+# identical actions in the graph literals (press_back(), click_tab("Home"),
+# ...) share one instance.
 
+@lru_cache(maxsize=None)
 def press_back(wait_after: float = 0.8, desc: str = "Press back") -> NavigationAction:
     """Create a press back action."""
     return NavigationAction(
@@ -57,6 +69,7 @@ def press_back(wait_after: float = 0.8, desc: str = "Press back") -> NavigationA
     )
 
 
+@lru_cache(maxsize=None)
 def click_text(text: str, wait_after: float = 1.0, desc: str = "") -> NavigationAction:
     """Create a click by text action."""
     return NavigationAction(
@@ -67,6 +80,7 @@ def click_text(text: str, wait_after: float = 1.0, desc: str = "") -> Navigation
     )
 
 
+@lru_cache(maxsize=None)
 def click_content_desc(desc_text: str, wait_after: float = 1.0, desc: str = "") -> NavigationAction:
     """Create a click by content description action."""
     return NavigationAction(
@@ -77,6 +91,7 @@ def click_content_desc(desc_text: str, wait_after: float = 1.0, desc: str = "")
     )
 
 
+@lru_cache(maxsize=None)
 def click_tab(tab_name: str, wait_after: float = 1.0) -> NavigationAction:
     """Create a tab click action (uses content description)."""
     return NavigationAction(
@@ -87,16 +102,19 @@ def click_tab(tab_name: str, wait_after: float = 1.0) -> NavigationAction:
     )
 
 
+@lru_cache(maxsize=None)
 def click_element(xpath: str, wait_after: float = 1.0, desc: str = "") -> NavigationAction:
-    """Create a click by XPath action."""
+    """Create a click by XPath action (the XPath is compiled here, once)."""
     return NavigationAction(
         action_type=ActionType.CLICK_ELEMENT,
         target=xpath,
+        xpath=etree.XPath(xpath),
         wait_after=wait_after,
         description=desc or f"Click: {xpath[:50]}",
     )
 
 
+@lru_cache(maxsize=None)
 def wait(seconds: float, desc: str = "") -> NavigationAction:
     """Create a wait action."""
     return NavigationAction(
@@ -106,6 +124,7 @@ def wait(seconds: float, desc: str = "") -> NavigationAction:
     )
 
 
+@lru_cache(maxsize=None)
 def swipe_down(wait_after: float = 0.5) -> NavigationAction:
     """Create a swipe down action."""
     return NavigationAction(
@@ -115,6 +134,7 @@ def swipe_down(wait_after: float = 0.5) -> NavigationAction:
     )
 
 
+@lru_cache(maxsize=None)
 def swipe_up(wait_after: float = 0.5) -> NavigationAction:
     """Create a swipe up action."""
     return NavigationAction(
@@ -124,6 +144,7 @@ def swipe_up(wait_after: float = 0.5) -> NavigationAction:
     )
 
 
+@lru_cache(maxsize=None)
 def launch_app(package: str, wait_after: float = 3.0) -> NavigationAction:
     """Create a launch app action."""
     return NavigationAction(
@@ -155,6 +176,9 @@ WARMUP_SAFE_STATES: Set[str] = {
     "home_feed",
 }
 
+# WARMUP_SAFE_STATES as a stable, ready-to-serialize tuple
+WARMUP_SAFE_STATES_ORDERED: Tuple[str, ...] = tuple(sorted(WARMUP_SAFE_STATES))
+
 # Safe states after login
 LOGIN_SAFE_STATES: Set[str] = {
     "home_feed",
@@ -182,45 +206,45 @@ OVERLAY_SCREENS: Set[str] = {
 # Login Flow Graph
 # =============================================================================
 
-LOGIN_FLOW_GRAPH: Dict[str, List[NavigationEdge]] = {
+LOGIN_FLOW_GRAPH: Dict[str, Tuple[NavigationEdge, ...]] = {
     # Login page transitions
-    "login_page": [
+    "login_page": (
         NavigationEdge(
             to_screen="login_password",
-            actions=[click_element("//*[@resource-id[contains(., 'login_username')]]")],
+            actions=(click_element("//*[@resource-id[contains(., 'login_username')]]"),),
             cost=1.0,
             description="Enter username field",
         ),
-    ],
+    ),
 
     # Save login info prompt
-    "login_save_info": [
+    "login_save_info": (
         NavigationEdge(
             to_screen="home_feed",
-            actions=[click_text("Not now", wait_after=2.0)],
+            actions=(click_text("Not now", wait_after=2.0),),
             cost=1.0,
             reliability=0.98,
             description="Skip save login info",
         ),
         NavigationEdge(
             to_screen="home_feed",
-            actions=[click_text("Not Now", wait_after=2.0)],
+            actions=(click_text("Not Now", wait_after=2.0),),
             cost=1.0,
             reliability=0.95,
             description="Skip save login info (alt)",
         ),
-    ],
+    ),
 
     # Notifications prompt
-    "notifications_prompt": [
+    "notifications_prompt": (
         NavigationEdge(
             to_screen="home_feed",
-            actions=[click_text("Not Now", wait_after=1.5)],
+            actions=(click_text("Not Now", wait_after=1.5),),
             cost=1.0,
             reliability=0.98,
             description="Skip notifications prompt",
         ),
-    ],
+    ),
 }
 
 
@@ -228,379 +252,499 @@ LOGIN_FLOW_GRAPH: Dict[str, List[NavigationEdge]] = {
 # Main App Navigation Graph
 # =============================================================================
 
-MAIN_APP_GRAPH: Dict[str, List[NavigationEdge]] = {
+MAIN_APP_GRAPH: Dict[str, Tuple[NavigationEdge, ...]] = {
     # -------------------------------------------------------------------------
     # Home Feed
     # -------------------------------------------------------------------------
-    "home_feed": [
+    "home_feed": (
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[click_tab("Search and explore")],
+            actions=(click_tab("Search and explore"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Explore from Home",
         ),
         NavigationEdge(
             to_screen="reels_tab",
-            actions=[click_tab("Reels")],
+            actions=(click_tab("Reels"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Reels tab",
         ),
         NavigationEdge(
             to_screen="profile_page",
-            actions=[click_tab("Profile")],
+            actions=(click_tab("Profile"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Profile",
         ),
         NavigationEdge(
             to_screen="dm_inbox",
-            actions=[click_content_desc("Direct message button, Double tap for direct messages")],
+            actions=(click_content_desc("Direct message button, Double tap for direct messages"),),
             cost=1.0,
             reliability=0.95,
             description="Go to DM inbox",
         ),
         NavigationEdge(
             to_screen="create_post_select",
-            actions=[click_tab("Create")],
+            actions=(click_tab("Create"),),
             cost=1.0,
             reliability=0.95,
             description="Open create menu",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # Explore Grid
     # -------------------------------------------------------------------------
-    "explore_grid": [
+    "explore_grid": (
         NavigationEdge(
             to_screen="home_feed",
-            actions=[click_tab("Home")],
+            actions=(click_tab("Home"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Home from Explore",
         ),
         NavigationEdge(
             to_screen="search_input",
-            actions=[click_element("//*[contains(@resource-id, 'action_bar_search_edit_text')]")],
+            actions=(click_element("//*[contains(@resource-id, 'action_bar_search_edit_text')]"),),
             cost=1.0,
             reliability=0.98,
             description="Focus search input",
         ),
         NavigationEdge(
             to_screen="reels_tab",
-            actions=[click_tab("Reels")],
+            actions=(click_tab("Reels"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Reels tab from Explore",
         ),
         NavigationEdge(
             to_screen="profile_page",
-            actions=[click_tab("Profile")],
+            actions=(click_tab("Profile"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Profile from Explore",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # Search Results
     # -------------------------------------------------------------------------
-    "search_results_reels": [
+    "search_results_reels": (
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[press_back(wait_after=1.0)],
+            actions=(press_back(wait_after=1.0),),
             cost=1.0,
             reliability=0.95,
             description="Back to Explore from search results",
         ),
         NavigationEdge(
             to_screen="reel_viewing",
-            actions=[click_element("//*[contains(@resource-id, 'image_button')]", wait_after=1.5)],
+            actions=(click_element("//*[contains(@resource-id, 'image_button')]", wait_after=1.5),),
             cost=1.0,
             reliability=0.9,
             description="Open first reel from search",
         ),
-    ],
+    ),
 
-    "search_results_accounts": [
+    "search_results_accounts": (
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.95,
             description="Back to Explore",
         ),
-    ],
+    ),
 
-    "search_results_tags": [
+    "search_results_tags": (
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.95,
             description="Back to Explore",
         ),
-    ],
+    ),
 
-    "search_input": [
+    "search_input": (
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.98,
             description="Cancel search",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # Reel Viewing
     # -------------------------------------------------------------------------
-    "reel_viewing": [
+    "reel_viewing": (
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[press_back(wait_after=1.0)],
+            actions=(press_back(wait_after=1.0),),
             cost=1.0,
             reliability=0.9,
             description="Exit reel to Explore",
         ),
         NavigationEdge(
             to_screen="comments_view",
-            actions=[click_content_desc("Comment")],
+            actions=(click_content_desc("Comment"),),
             cost=1.0,
             reliability=0.95,
             description="Open comments",
         ),
         NavigationEdge(
             to_screen="likes_page",
-            actions=[click_element("//*[contains(@resource-id, 'like_count')]")],
+            actions=(click_element("//*[contains(@resource-id, 'like_count')]"),),
             cost=1.0,
             reliability=0.85,
             description="Open likes page",
         ),
         NavigationEdge(
             to_screen="profile_page",
-            actions=[click_element("//*[contains(@resource-id, 'clips_author_profile_pic') or contains(@resource-id, 'row_feed_photo_profile_imageview')]")],
+            actions=(click_element("//*[contains(@resource-id, 'clips_author_profile_pic') or contains(@resource-id, 'row_feed_photo_profile_imageview')]"),),
             cost=1.0,
             reliability=0.9,
             description="Go to reel author profile",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # Reels Tab
     # -------------------------------------------------------------------------
-    "reels_tab": [
+    "reels_tab": (
         NavigationEdge(
             to_screen="home_feed",
-            actions=[click_tab("Home")],
+            actions=(click_tab("Home"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Home from Reels",
         ),
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[click_tab("Search and explore")],
+            actions=(click_tab("Search and explore"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Explore from Reels",
         ),
         NavigationEdge(
             to_screen="comments_view",
-            actions=[click_content_desc("Comment")],
+            actions=(click_content_desc("Comment"),),
             cost=1.0,
             reliability=0.95,
             description="Open comments on reel",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # Profile Page
     # -------------------------------------------------------------------------
-    "profile_page": [
+    "profile_page": (
         NavigationEdge(
             to_screen="home_feed",
-            actions=[click_tab("Home")],
+            actions=(click_tab("Home"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Home from Profile",
         ),
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[click_tab("Search and explore")],
+            actions=(click_tab("Search and explore"),),
             cost=1.0,
             reliability=0.98,
             description="Go to Explore from Profile",
         ),
         NavigationEdge(
             to_screen="profile_followers",
-            actions=[click_element("//*[contains(@resource-id, 'row_profile_header_followers_container')]")],
+            actions=(click_element("//*[contains(@resource-id, 'row_profile_header_followers_container')]"),),
             cost=1.0,
             reliability=0.9,
             description="Open followers list",
         ),
         NavigationEdge(
             to_screen="profile_following",
-            actions=[click_element("//*[contains(@resource-id, 'row_profile_header_following_container')]")],
+            actions=(click_element("//*[contains(@resource-id, 'row_profile_header_following_container')]"),),
             cost=1.0,
             reliability=0.9,
             description="Open following list",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # Overlay screens (dismissable)
     # -------------------------------------------------------------------------
-    "comments_view": [
+    "comments_view": (
         NavigationEdge(
             to_screen="reel_viewing",
-            actions=[press_back(wait_after=0.5)],
+            actions=(press_back(wait_after=0.5),),
             cost=1.0,
             reliability=0.98,
             description="Close comments",
         ),
-    ],
+    ),
 
-    "likes_page": [
+    "likes_page": (
         NavigationEdge(
             to_screen="reel_viewing",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.98,
             description="Close likes page",
         ),
-    ],
+    ),
 
-    "share_sheet": [
+    "share_sheet": (
         NavigationEdge(
             to_screen="reel_viewing",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.98,
             description="Close share sheet",
         ),
-    ],
+    ),
 
-    "peek_view": [
+    "peek_view": (
         NavigationEdge(
             to_screen="explore_grid",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.98,
             description="Close peek view",
         ),
-    ],
+    ),
 
-    "profile_followers": [
+    "profile_followers": (
         NavigationEdge(
             to_screen="profile_page",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.98,
             description="Close followers list",
         ),
-    ],
+    ),
 
-    "profile_following": [
+    "profile_following": (
         NavigationEdge(
             to_screen="profile_page",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.98,
             description="Close following list",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # DM Inbox
     # -------------------------------------------------------------------------
-    "dm_inbox": [
+    "dm_inbox": (
         NavigationEdge(
             to_screen="home_feed",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.95,
             description="Back to Home from DMs",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # Story Viewing
     # -------------------------------------------------------------------------
-    "story_viewing": [
+    "story_viewing": (
         NavigationEdge(
             to_screen="home_feed",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.9,
             description="Exit story to Home",
         ),
-    ],
+    ),
 
     # -------------------------------------------------------------------------
     # Create Flow
     # -------------------------------------------------------------------------
-    "create_post_select": [
+    "create_post_select": (
         NavigationEdge(
             to_screen="home_feed",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.95,
             description="Cancel create",
         ),
-    ],
+    ),
 
-    "create_post_edit": [
+    "create_post_edit": (
         NavigationEdge(
             to_screen="create_post_select",
-            actions=[press_back()],
+            actions=(press_back(),),
             cost=1.0,
             reliability=0.9,
             description="Back to selection",
         ),
-    ],
+    ),
 }
 
 
-def get_full_graph() -> Dict[str, List[NavigationEdge]]:
-    """Get the complete merged navigation graph."""
-    graph: Dict[str, List[NavigationEdge]] = {}
+@lru_cache(maxsize=1)
+def get_full_graph() -> Mapping[str, Tuple[NavigationEdge, ...]]:
+    """
+    Get the complete merged navigation graph.
 
-    for screen_id, edges in LOGIN_FLOW_GRAPH.items():
-        graph[screen_id] = edges.copy()
+    The graph definitions are static, so it is merged once and returned as
+    a read-only mapping of edge tuples shared by every caller.
+    """
+    graph: Dict[str, Tuple[NavigationEdge, ...]] = dict(LOGIN_FLOW_GRAPH)
 
     for screen_id, edges in MAIN_APP_GRAPH.items():
-        if screen_id in graph:
-            graph[screen_id].extend(edges)
-        else:
-            graph[screen_id] = edges.copy()
+        graph[screen_id] = graph.get(screen_id, ()) + edges
 
-    return graph
+    return MappingProxyType(graph)
 
 
-def get_outgoing_edges(screen_id: str) -> List[NavigationEdge]:
+def get_outgoing_edges(screen_id: str) -> Tuple[NavigationEdge, ...]:
     """Get all outgoing edges from a screen."""
+    return get_full_graph().get(screen_id, ())
+
+
+@lru_cache(maxsize=1)
+def _edge_summaries() -> Mapping[str, Tuple[Dict[str, Any], ...]]:
+    return MappingProxyType({
+        screen_id: tuple(
+            {
+                "to_screen": e.to_screen,
+                "cost": e.cost,
+                "reliability": e.reliability,
+                "description": e.description,
+                "actions_count": len(e.actions),
+            }
+            for e in edges
+        )
+        for screen_id, edges in get_full_graph().items()
+    })
+
+
+def get_edge_summaries(screen_id: str) -> Tuple[Dict[str, Any], ...]:
+    """
+    Get the outgoing edges of a screen in get_navigation_graph's response
+    shape (to_screen, cost, reliability, description, actions_count).
+
+    Built once for the whole graph; treat the dicts as read-only.
+    """
+    return _edge_summaries().get(screen_id, ())
+
+
+@lru_cache(maxsize=1)
+def get_all_screens() -> Tuple[str, ...]:
+    """Get the sorted IDs of all screens with outgoing edges."""
+    return tuple(sorted(get_full_graph()))
+
+
+@lru_cache(maxsize=1)
+def get_graph_summary() -> Dict[str, Any]:
+    """
+    Get get_navigation_graph's summary-mode response (total_screens,
+    all_screens, safe_states). Built once; treat it as read-only.
+    """
+    all_screens = get_all_screens()
+    return {
+        "total_screens": len(all_screens),
+        "all_screens": all_screens,
+        "safe_states": WARMUP_SAFE_STATES_ORDERED,
+    }
+
+
+@lru_cache(maxsize=1)
+def _reachability() -> Tuple[Mapping[str, frozenset], int]:
+    """
+    Screens reachable from each source screen, and the graph diameter (most
+    edges on any shortest path). One level-order BFS per source, computed once.
+    """
     graph = get_full_graph()
-    return graph.get(screen_id, [])
+    reachable: Dict[str, frozenset] = {}
+    diameter = 0
+    for source in graph:
+        visited: Set[str] = set()
+        frontier = [source]
+        depth = 0
+        while frontier:
+            next_frontier = []
+            for current in frontier:
+                for edge in graph.get(current, ()):
+                    if edge.to_screen not in visited:
+                        visited.add(edge.to_screen)
+                        next_frontier.append(edge.to_screen)
+            if next_frontier:
+                depth += 1
+            frontier = next_frontier
+        reachable[source] = frozenset(visited)
+        diameter = max(diameter, depth)
+    return MappingProxyType(reachable), diameter
+
+
+def get_reachable_screens(screen_id: str) -> frozenset:
+    """Get every screen reachable from screen_id in one or more steps."""
+    return _reachability()[0].get(screen_id, frozenset())
+
+
+def get_graph_diameter() -> int:
+    """Get the most steps any shortest path in the graph takes."""
+    return _reachability()[1]
 
 
 def has_path(from_screen: str, to_screen: str) -> bool:
     """Quick check if a path exists between two screens."""
     if from_screen == to_screen:
         return True
+    return to_screen in get_reachable_screens(from_screen)
+
+
+def plan(from_screen: str, to_screen: str) -> Optional[Tuple[NavigationEdge, ...]]:
+    """
+    Find the cheapest edge sequence between two screens (Dijkstra).
+
+    Edges are weighted cost - log(reliability), so a path's weight is its
+    total cost plus the negative log of its success probability: cheap,
+    reliable edges win over the fewest-hops path find_path returns.
+
+    Returns:
+        Tuple of edges to follow (empty if from_screen == to_screen),
+        None if to_screen is unreachable
+    """
+    if from_screen == to_screen:
+        return ()
+    if not has_path(from_screen, to_screen):
+        return None
 
     graph = get_full_graph()
-    visited: Set[str] = {from_screen}
-    queue = [from_screen]
-
-    while queue:
-        current = queue.pop(0)
-        for edge in graph.get(current, []):
-            if edge.to_screen == to_screen:
-                return True
-            if edge.to_screen not in visited:
-                visited.add(edge.to_screen)
-                queue.append(edge.to_screen)
-
-    return False
+    best: Dict[str, float] = {from_screen: 0.0}
+    came_by: Dict[str, Tuple[str, NavigationEdge]] = {}
+    # (weight, tie-break, screen): the counter keeps screens from being compared
+    heap = [(0.0, 0, from_screen)]
+    pushed = 0
+
+    while heap:
+        weight, _, current = heapq.heappop(heap)
+        if current == to_screen:
+            break
+        if weight > best[current]:
+            continue  # stale entry
+        for edge in graph.get(current, ()):
+            if edge.reliability <= 0.0:
+                continue
+            new_weight = weight + edge.cost - math.log(edge.reliability)
+            if new_weight < best.get(edge.to_screen, math.inf):
+                best[edge.to_screen] = new_weight
+                came_by[edge.to_screen] = (current, edge)
+                pushed += 1
+                heapq.heappush(heap, (new_weight, pushed, edge.to_screen))
+
+    if to_screen not in came_by:
+        return None
+    edges = []
+    screen = to_screen
+    while screen != from_screen:
+        screen, edge = came_by[screen]
+        edges.append(edge)
+    return tuple(reversed(edges))
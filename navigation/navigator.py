@@ -6,12 +6,15 @@
 # - Action execution (click, tap, swipe, etc.)
 # - Navigation with verification and re-pathfinding
 
+import re
 import time
 import logging
 from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional, Dict, Set, Any
+from typing import List, Optional, Dict, Set, Any, Tuple
+
+from lxml import etree
 
 from .detector import ScreenDetector
 from .graph import (
@@ -19,12 +22,18 @@ from .graph import (
     NavigationAction,
     NavigationEdge,
     get_full_graph,
+    get_graph_diameter,
+    get_reachable_screens,
+    has_path,
     WARMUP_SAFE_STATES,
     LOGIN_SAFE_STATES,
 )
 
 logger = logging.getLogger(__name__)
 
+# eg: bounds="[883,2222][1008,2265]"
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
 
 class NavigationStatus(str, Enum):
     """Status of navigation attempt."""
@@ -135,7 +144,8 @@ class ScreenNavigator:
     def find_path(
         self,
         from_screen: str,
-        to_screen: str
+        to_screen: str,
+        max_depth: Optional[int] = None,
     ) -> Optional[NavigationPath]:
         """
         Find shortest path between two screens using BFS.
@@ -143,12 +153,18 @@ class ScreenNavigator:
         Args:
             from_screen: Starting screen ID
             to_screen: Destination screen ID
+            max_depth: Longest path (in steps) to consider; defaults to the
+                graph diameter, which every shortest path fits in
 
         Returns:
             NavigationPath if path exists, None otherwise
         """
         if from_screen == to_screen:
             return NavigationPath(steps=[], total_cost=0.0, estimated_reliability=1.0)
+        if not has_path(from_screen, to_screen):
+            return None
+        if max_depth is None:
+            max_depth = get_graph_diameter()
 
         # BFS: (current_screen, path_so_far, total_cost, total_reliability)
         queue = deque([(from_screen, [], 0.0, 1.0)])
@@ -156,6 +172,8 @@ class ScreenNavigator:
 
         while queue:
             current, path, cost, reliability = queue.popleft()
+            if len(path) >= max_depth:
+                continue
 
             edges = self._graph.get(current, [])
             for edge in edges:
@@ -186,7 +204,8 @@ class ScreenNavigator:
     def find_path_to_any(
         self,
         from_screen: str,
-        targets: Set[str]
+        targets: Set[str],
+        max_depth: Optional[int] = None,
     ) -> Optional[NavigationPath]:
         """
         Find shortest path to any screen in target set.
@@ -194,18 +213,26 @@ class ScreenNavigator:
         Args:
             from_screen: Starting screen
             targets: Set of acceptable destinations
+            max_depth: Longest path (in steps) to consider; defaults to the
+                graph diameter
 
         Returns:
             NavigationPath to closest target, None if unreachable
         """
         if from_screen in targets:
             return NavigationPath(steps=[], total_cost=0.0, estimated_reliability=1.0)
+        if get_reachable_screens(from_screen).isdisjoint(targets):
+            return None
+        if max_depth is None:
+            max_depth = get_graph_diameter()
 
         queue = deque([(from_screen, [], 0.0, 1.0)])
         visited: Set[str] = {from_screen}
 
         while queue:
             current, path, cost, reliability = queue.popleft()
+            if len(path) >= max_depth:
+                continue
 
             edges = self._graph.get(current, [])
             for edge in edges:
@@ -238,6 +265,7 @@ class ScreenNavigator:
         target: str,
         max_attempts: int = 3,
         verify_each_step: bool = True,
+        max_depth: Optional[int] = None,
     ) -> NavigationResult:
         """
         Navigate to target screen with automatic re-pathfinding.
@@ -246,6 +274,8 @@ class ScreenNavigator:
             target: Destination screen ID
             max_attempts: Maximum navigation attempts
             verify_each_step: If True, verify screen after each step
+            max_depth: Longest path (in steps) to plan; defaults to the
+                graph diameter
 
         Returns:
             NavigationResult with status and details
@@ -287,7 +317,7 @@ class ScreenNavigator:
                 )
 
             # Find path
-            path = self.find_path(current_screen, target)
+            path = self.find_path(current_screen, target, max_depth)
             if path is None:
                 return NavigationResult(
                     status=NavigationStatus.NO_PATH,
@@ -429,6 +459,16 @@ class ScreenNavigator:
             logger.error(f"Step execution error: {e}")
             return False
 
+    def _find_xpath_center(self, xpath: etree.XPath) -> Optional[Tuple[int, int]]:
+        """Center of the first node matching a compiled XPath on the current screen."""
+        root = etree.fromstring(self.device.dump_hierarchy().encode("utf-8"))
+        for node in xpath(root):
+            match = _BOUNDS_RE.match(node.get("bounds", ""))
+            if match:
+                left, top, right, bottom = map(int, match.groups())
+                return (left + right) // 2, (top + bottom) // 2
+        return None
+
     def _execute_action(self, action: NavigationAction) -> bool:
         """Execute a single navigation action."""
         try:
@@ -480,7 +520,15 @@ class ScreenNavigator:
                 return False
 
             elif action.action_type == ActionType.CLICK_ELEMENT:
-                if action.target:
+                if action.xpath is not None:
+                    # Precompiled: evaluate against one dump, click the first match
+                    center = self._find_xpath_center(action.xpath)
+                    if center:
+                        self.device.click(*center)
+                        time.sleep(action.wait_after)
+                        return True
+                    logger.warning(f"Element not found: {action.target}")
+                elif action.target:
                     elem = self.device.xpath(action.target)
                     if elem.exists:
                         elem.click()
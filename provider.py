@@ -32,21 +32,32 @@ class BaseProvider(abc.ABC):
 
 class AndroidProvider(BaseProvider):
     def __init__(self):
-        pass
+        # serial -> (model, name). Reading them costs two getprop shell calls
+        # per device, and they cannot change while the device stays connected.
+        self._device_props: dict[str, tuple[str, str]] = {}
 
     def list_devices(self) -> list[DeviceInfo]:
         adb = adbutils.AdbClient()
         ret: list[DeviceInfo] = []
+        online: set[str] = set()
         for d in adb.list():
             if d.state != "device":
                 ret.append(DeviceInfo(serial=d.serial, status=d.state, enabled=False))
             else:
-                dev = adb.device(d.serial)
-                ret.append(
-                    DeviceInfo(
-                        serial=d.serial, model=dev.prop.model, name=dev.prop.name
-                    )
-                )
+                online.add(d.serial)
+                props = self._device_props.get(d.serial)
+                if props is None:
+                    dev = adb.device(d.serial)
+                    props = (dev.prop.model, dev.prop.name)
+                    self._device_props[d.serial] = props
+                ret.append(DeviceInfo(serial=d.serial, model=props[0], name=props[1]))
+
+        # Forget devices that went away so a re-plugged device is read again.
+        # Concurrent callers (the ADB thread pool) may prune the same serial
+        # or insert while we iterate: snapshot the keys and pop leniently.
+        for serial in list(self._device_props):
+            if serial not in online:
+                self._device_props.pop(serial, None)
         return ret
 
     @lru_cache
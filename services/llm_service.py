@@ -1,4 +1,3 @@
-import json
 import logging
 from typing import AsyncGenerator
 
@@ -12,44 +11,18 @@ async def generate_chat_completion_stream(
     request_data: LlmServiceChatRequest,
 ) -> AsyncGenerator[str, None]:
     """
-    Main entry point for the LLM service. This function now buffers the
-    complete response from the LLM to detect if it's a structured JSON tool
-    call or a standard text/markdown message.
-    """
+    Main entry point for the LLM service. Forwards each SSE frame from the
+    selected backend as soon as it arrives, so the client sees the first token
+    without waiting for the whole completion.
 
-    # --- Buffering Logic ---
-    # Instead of streaming directly, we accumulate the full response first.
-    full_response_parts = []
+    `propose_edit` tool calls are detected by the frontend once it has
+    accumulated the full message, so no server-side buffering is needed.
+    """
+    received_any = False
     async for chunk in router.dispatch_chat_completion_stream(request_data):
-        full_response_parts.append(chunk)
-
-    full_response = "".join(full_response_parts)
+        received_any = True
+        yield chunk
 
-    if not full_response:
+    if not received_any:
         logger.warning("[LLM SERVICE] Received an empty response from the backend.")
         yield ""
-        return
-
-    # --- Tool Call Detection Logic ---
-    # Check if the complete response is our structured JSON tool call.
-    stripped_response = full_response.strip()
-    if stripped_response.startswith("{") and stripped_response.endswith("}"):
-        try:
-            parsed_json = json.loads(stripped_response)
-            # Verify it's the tool we expect.
-            if parsed_json.get("tool_name") == "propose_edit":
-                logger.info(
-                    "[LLM SERVICE] Detected 'propose_edit' tool call. Forwarding JSON."
-                )
-                yield stripped_response
-                return  # End execution after forwarding the tool call.
-        except json.JSONDecodeError:
-            # It looked like JSON, but wasn't valid. Fall through to treat as text.
-            logger.warning(
-                "[LLM SERVICE] Failed to parse potential JSON, treating as plain text."
-            )
-
-    # --- Fallback for Standard Messages ---
-    # If it's not a valid tool call, treat it as a standard text message.
-    logger.info("[LLM SERVICE] Forwarding standard text response.")
-    yield full_response
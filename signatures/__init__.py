@@ -7,17 +7,25 @@
 # - Registry for app-specific signatures
 
 from .base import (
+    CompiledSelector,
     ScreenSignature,
     ScreenDetectionResult,
+    SignatureIndex,
     SignatureRegistry,
+    compile_selector,
+    get_signature_index,
     get_signatures_for_app,
     register_signatures,
 )
 
 __all__ = [
+    "CompiledSelector",
     "ScreenSignature",
     "ScreenDetectionResult",
+    "SignatureIndex",
     "SignatureRegistry",
+    "compile_selector",
+    "get_signature_index",
     "get_signatures_for_app",
     "register_signatures",
 ]
@@ -4,12 +4,14 @@
 # The signature system allows Claude to know "where am I?" in any app
 # by matching UI element fingerprints against known screens.
 
+import sys
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Set
+from functools import lru_cache
+from typing import List, Dict, Optional, Set, Tuple
 from enum import Enum
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ScreenSignature:
     """
     Defines the UI fingerprint for a specific app screen.
@@ -140,6 +142,143 @@ class ScreenDetectionResult:
         }
 
 
+# Compiled selector kinds (see compile_selector)
+SELECTOR_ID_PART = 0
+SELECTOR_CONTENT_DESC = 1
+SELECTOR_TEXT = 2
+SELECTOR_CLASS_SHORT = 3
+SELECTOR_CONTAINS = 4
+SELECTOR_OR = 5
+SELECTOR_GENERIC = 6
+
+
+@dataclass(frozen=True)
+class CompiledSelector:
+    """
+    A signature selector parsed once into a match kind and its payload.
+
+    Attributes:
+        kind: One of the SELECTOR_* constants
+        key: Element token (or id part / lowercased search text) to look for
+        subterms: OR alternatives (CompiledSelector), GENERIC element tokens,
+            or the ("id:<part>", ":id/<part>") pair for ID_PART
+
+    Element tokens are interned, like the ones _extract_elements produces,
+    so set lookups usually succeed on identity without comparing strings.
+    """
+    kind: int
+    key: str = ""
+    subterms: tuple = ()
+
+
+@lru_cache(maxsize=None)
+def compile_selector(selector: str) -> CompiledSelector:
+    """
+    Parse a selector string (see ScreenSignature) into a CompiledSelector.
+
+    Checks run in the same order the detector used to apply them, so
+    "Like OR Unlike" is an OR even if a part contains ":id/", etc.
+    """
+    if " OR " in selector:
+        return CompiledSelector(
+            SELECTOR_OR,
+            subterms=tuple(compile_selector(part.strip()) for part in selector.split(" OR ")),
+        )
+    if selector.startswith("contains:"):
+        return CompiledSelector(SELECTOR_CONTAINS, selector[9:].lower())
+    # ":id/foo" (any package) and the short "id:foo" match the same elements
+    if ":id/" in selector or selector.startswith("id:"):
+        id_part = selector.split(":id/")[-1] if ":id/" in selector else selector[3:]
+        return CompiledSelector(
+            SELECTOR_ID_PART, id_part, (sys.intern(f"id:{id_part}"), f":id/{id_part}")
+        )
+    if selector.startswith("content-desc:"):
+        return CompiledSelector(SELECTOR_CONTENT_DESC, sys.intern(selector))
+    if selector.startswith("text:"):
+        return CompiledSelector(SELECTOR_TEXT, sys.intern(selector))
+    if selector[:1].isupper() and ":" not in selector:
+        return CompiledSelector(SELECTOR_CLASS_SHORT, sys.intern(f"class-short:{selector}"))
+    return CompiledSelector(
+        SELECTOR_GENERIC,
+        subterms=tuple(
+            sys.intern(f"{prefix}:{selector}") for prefix in ("content-desc", "text", "id")
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class SignatureMasks:
+    """
+    One signature's selector lists as bitmasks over SignatureIndex selector ids.
+
+    A selector listed twice in the same list counts once.
+    """
+    unique: int
+    required: int
+    forbidden: int
+    optional: int
+    required_count: int
+    optional_count: int
+
+
+@dataclass
+class SignatureIndex:
+    """
+    Shared selector table for a signature list.
+
+    Every distinct selector gets a bit id, and each signature is stored as
+    bitmasks over those ids. Detection evaluates each distinct selector once
+    into a single element mask, then scores every signature with integer
+    AND + bit_count instead of re-matching selectors signature by signature.
+
+    Attributes:
+        signatures: Signatures in priority order
+        masks: SignatureMasks, parallel to signatures
+        selectors: Distinct selectors; bit i of a mask is selectors[i]
+        compiled: CompiledSelector for each entry of selectors
+    """
+    signatures: List[ScreenSignature]
+    masks: List[SignatureMasks] = field(default_factory=list)
+    selectors: List[str] = field(default_factory=list)
+    compiled: List[CompiledSelector] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, signatures: List[ScreenSignature]) -> "SignatureIndex":
+        index = cls(signatures=signatures)
+        bits: Dict[str, int] = {}
+
+        def mask_of(selectors: List[str]) -> int:
+            mask = 0
+            for selector in selectors:
+                bit = bits.get(selector)
+                if bit is None:
+                    bit = bits[selector] = 1 << len(index.selectors)
+                    index.selectors.append(selector)
+                    index.compiled.append(compile_selector(selector))
+                mask |= bit
+            return mask
+
+        for sig in signatures:
+            required = mask_of(sig.required)
+            optional = mask_of(sig.optional)
+            index.masks.append(SignatureMasks(
+                unique=mask_of(sig.unique),
+                required=required,
+                forbidden=mask_of(sig.forbidden),
+                optional=optional,
+                required_count=required.bit_count(),
+                optional_count=optional.bit_count(),
+            ))
+        return index
+
+    def selectors_in(self, mask: int) -> Set[str]:
+        """Return the selectors whose bits are set in mask."""
+        return {
+            selector for position, selector in enumerate(self.selectors)
+            if mask >> position & 1
+        }
+
+
 class SignatureRegistry:
     """
     Central registry for all app screen signatures.
@@ -162,9 +301,12 @@ class SignatureRegistry:
     def __init__(self):
         self._signatures: Dict[str, List[ScreenSignature]] = {}
         self._by_screen_id: Dict[str, Dict[str, ScreenSignature]] = {}
+        # (app_id, include_system) -> index, rebuilt after any registration
+        self._indexes: Dict[Tuple[str, bool], SignatureIndex] = {}
 
     def register(self, app_id: str, signatures: List[ScreenSignature]) -> None:
         """Register signatures for an app."""
+        self._indexes.clear()
         self._signatures[app_id] = signatures
         self._by_screen_id[app_id] = {
             sig.screen_id: sig for sig in signatures
@@ -197,6 +339,15 @@ class SignatureRegistry:
 
         return sigs
 
+    def get_index(self, app_id: str, include_system: bool = True) -> SignatureIndex:
+        """Get the (memoized) inverted selector index for get_signatures()."""
+        key = (app_id, include_system)
+        index = self._indexes.get(key)
+        if index is None:
+            index = SignatureIndex.build(self.get_signatures(app_id, include_system))
+            self._indexes[key] = index
+        return index
+
     def get_signature(self, app_id: str, screen_id: str) -> Optional[ScreenSignature]:
         """Get a specific signature by app and screen ID."""
         app_sigs = self._by_screen_id.get(app_id, {})
@@ -231,6 +382,14 @@ def get_signatures_for_app(
     return _registry.get_signatures(app_id, include_system)
 
 
+def get_signature_index(
+    app_id: str,
+    include_system: bool = True
+) -> SignatureIndex:
+    """Get the inverted selector index for an app's signatures."""
+    return _registry.get_index(app_id, include_system)
+
+
 def register_signatures(app_id: str, signatures: List[ScreenSignature]) -> None:
     """Register signatures for an app in the global registry."""
     _registry.register(app_id, signatures)
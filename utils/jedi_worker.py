@@ -0,0 +1,36 @@
+"""
+Jedi completion worker for the /api/python/completions process pool.
+
+Jedi is pure Python and holds the GIL for the whole completion, so it runs in
+separate processes. Each worker builds its own jedi.Project once (Jedi state
+is not picklable) and keeps Jedi's parser caches warm between requests.
+"""
+
+from typing import Dict, List, Optional
+
+import jedi
+
+_project: Optional[jedi.Project] = None
+
+
+def init_worker(project_path: str, sys_path: List[str]) -> None:
+    """Process pool initializer: create the per-worker Jedi project."""
+    global _project
+    # Jedi's diff parser reuses the unchanged parts of a module between calls
+    # for the same path, so repeated completions on the inspector buffer only
+    # reparse the edited region.
+    jedi.settings.fast_parser = True
+    _project = jedi.Project(path=project_path, sys_path=sys_path, smart_sys_path=True)
+
+
+def complete(
+    code: str, filename: Optional[str], line: int, column: int
+) -> List[Dict[str, Optional[str]]]:
+    """Run a Jedi completion and return PythonCompletionSuggestion-shaped dicts."""
+    script = jedi.Script(code=code, path=filename, project=_project)
+    # Completion always has .complete and .name_with_symbols on supported
+    # Jedi versions, so no getattr fallbacks per item
+    return [
+        {"text": c.complete, "displayText": c.name_with_symbols, "type": c.type}
+        for c in script.complete(line=line, column=column)
+    ]
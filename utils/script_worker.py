@@ -0,0 +1,27 @@
+"""
+run_script worker for the MCP server's per-device script processes.
+
+User scripts run in a separate process (instead of a thread) so a script that
+overruns its timeout can actually be stopped by terminating the process.
+Each worker connects to its device once and reuses the connection for every
+script it runs.
+"""
+
+from typing import Any, Dict, Optional
+
+import uiautomator2 as u2
+
+from utils.interactive_executor import execute_interactive_code
+
+_device: Optional[u2.Device] = None
+
+
+def init_worker(serial: str) -> None:
+    """Process pool initializer: connect to the worker's device."""
+    global _device
+    _device = u2.connect_usb(serial)
+
+
+def run(code: str, enable_tracing: bool = False) -> Dict[str, Any]:
+    """Execute a script against the worker's device."""
+    return execute_interactive_code(code, _device, enable_tracing)